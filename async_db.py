@@ -0,0 +1,43 @@
+"""
+Async facade over models.DatabaseManager for the Telethon event loop.
+
+Every DatabaseManager method is exposed under the same name as a coroutine
+that runs on a dedicated thread pool, so PostgreSQL I/O never blocks the
+loop. Combined with the connection pool, independent queries can run
+concurrently (e.g. with asyncio.gather).
+"""
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Au plus DB_POOL_MAX requêtes utiles en parallèle ; au-delà elles attendraient une connexion
+EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', '4'))
+
+
+class AsyncDatabase:
+    """`await adb.get_config('key')` instead of `db.get_config('key')`"""
+
+    def __init__(self, manager, max_workers: int = EXECUTOR_WORKERS):
+        self.manager = manager
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.manager, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+        # Mis en cache: __getattr__ n'est plus appelé pour ce nom
+        setattr(self, name, call)
+        return call
+
+    def close(self) -> None:
+        """Wait for queued queries, then close the pool"""
+        self._executor.shutdown(wait=True)
+        self.manager.close()
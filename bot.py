@@ -4,20 +4,34 @@ Telegram Bot implementation with advanced features and deployment capabilities
 import os
 import logging
 import requests
-import json
-from typing import Dict, Any
-from handlers import TelegramHandlers
-from card_predictor import card_predictor
+from typing import Dict, Any, Optional
+from handlers import TelegramHandlers, TARGET_CHANNEL_ID
+from card_predictor import CardPredictor, card_predictor
+from metrics import STAGE_LATENCY
+from outbound import OutboundScheduler, outbound as shared_outbound
 
 logger = logging.getLogger(__name__)
 
 class TelegramBot:
-    def __init__(self, token: str):
+    def __init__(self, token: str, key: Optional[str] = None, source_channel_id: Optional[int] = None,
+                 outbound: Optional[OutboundScheduler] = None):
+        """
+        Args:
+            token: Bot API token
+            key: Identifiant du bot en mode multi-bots (/webhook/<key>); None pour le bot unique historique
+            source_channel_id: Canal de statistiques surveillé par ce bot (TARGET_CHANNEL_ID par défaut)
+            outbound: File d'envoi partagée; par défaut celle du processus
+        """
         self.token = token
+        self.key = key
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.deployment_file_path = "deployment_package_complete.zip"
+        self.outbound = outbound or shared_outbound
+        # Chaque bot hébergé a son propre état de prédiction
+        self.card_predictor = CardPredictor(key) if key else card_predictor
         # Initialize advanced handlers
-        self.handlers = TelegramHandlers(token)
+        self.handlers = TelegramHandlers(token, self.card_predictor, source_channel_id or TARGET_CHANNEL_ID,
+                                         self.outbound)
 
     def handle_update(self, update: Dict[str, Any]) -> None:
         """Handle incoming Telegram update with advanced features for webhook mode"""
@@ -28,10 +42,9 @@ class TelegramBot:
             elif 'edited_message' in update:
                 logger.info(f"🔄 Bot traite message édité via webhook")
             
-            logger.info(f"Received update: {json.dumps(update, indent=2)}")
-
             # Use the advanced handlers for processing (they handle card predictions too)
-            self.handlers.handle_update(update)
+            with STAGE_LATENCY.time(stage='handle'):
+                self.handlers.handle_update(update)
             
             # Log succès du traitement
             logger.info(f"✅ Update traité avec succès via webhook")
@@ -50,17 +63,17 @@ class TelegramBot:
                 text = message['text']
 
                 # Check if we should make a prediction
-                should_predict, game_number, combination = card_predictor.should_predict(text)
+                should_predict, game_number, combination = self.card_predictor.should_predict(text)
 
                 if should_predict and game_number is not None and combination is not None:
-                    prediction = card_predictor.make_prediction(game_number, combination)
+                    prediction = self.card_predictor.make_prediction(game_number, combination)
                     logger.info(f"Making prediction: {prediction}")
 
                     # Send prediction to the chat
                     self.send_message(chat_id, prediction)
 
                 # Check if this message verifies a previous prediction
-                verification_result = card_predictor.verify_prediction(text)
+                verification_result = self.card_predictor.verify_prediction(text)
                 if verification_result:
                     logger.info(f"Verification result: {verification_result}")
 
@@ -119,15 +132,13 @@ class TelegramBot:
     def send_message(self, chat_id: int, text: str) -> bool:
         """Send text message to user"""
         try:
-            url = f"{self.base_url}/sendMessage"
             data = {
                 'chat_id': chat_id,
                 'text': text,
                 'parse_mode': 'HTML'
             }
 
-            response = requests.post(url, json=data, timeout=10)
-            result = response.json()
+            result = self.outbound.call(self.token, 'sendMessage', json=data, timeout=10)
 
             if result.get('ok'):
                 logger.info(f"Message sent successfully to chat {chat_id}")
@@ -146,7 +157,6 @@ class TelegramBot:
     def send_document(self, chat_id: int, file_path: str) -> bool:
         """Send document file to user"""
         try:
-            url = f"{self.base_url}/sendDocument"
 
             with open(file_path, 'rb') as file:
                 files = {
@@ -157,8 +167,7 @@ class TelegramBot:
                     'caption': '📦 Deployment Package for render.com'
                 }
 
-                response = requests.post(url, data=data, files=files, timeout=60)
-                result = response.json()
+                result = self.outbound.call(self.token, 'sendDocument', data=data, files=files, timeout=60)
 
                 if result.get('ok'):
                     logger.info(f"Document sent successfully to chat {chat_id}")
@@ -180,14 +189,12 @@ class TelegramBot:
     def set_webhook(self, webhook_url: str) -> bool:
         """Set webhook URL for the bot"""
         try:
-            url = f"{self.base_url}/setWebhook"
             data = {
                 'url': webhook_url,
                 'allowed_updates': ['message', 'edited_message']
             }
 
-            response = requests.post(url, json=data, timeout=10)
-            result = response.json()
+            result = self.outbound.call(self.token, 'setWebhook', json=data, timeout=10)
 
             if result.get('ok'):
                 logger.info(f"Webhook set successfully: {webhook_url}")
@@ -206,9 +213,7 @@ class TelegramBot:
     def get_bot_info(self) -> Dict[str, Any]:
         """Get bot information"""
         try:
-            url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=30)
-            result = response.json()
+            result = self.outbound.call(self.token, 'getMe', http_method='GET', timeout=30)
 
             if result.get('ok'):
                 return result.get('result', {})
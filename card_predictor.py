@@ -9,6 +9,8 @@ from typing import Optional, Dict, List, Tuple
 import time
 import os
 import json
+import fastjson
+from metrics import DEDUP_LOOKUPS, VERIFICATIONS
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +29,18 @@ TARGET_CHANNEL_ID = -1002682552255
 # Target channel ID for predictions and updates
 PREDICTION_CHANNEL_ID = -1002646551216
 
+# Snapshot of in-flight predictions, written on shutdown and reloaded on start
+STATE_FILE = '.predictor_state.json'
+
 class CardPredictor:
     """Handles card prediction logic for webhook deployment"""
 
-    def __init__(self):
+    def __init__(self, key: Optional[str] = None):
+        # Suffixe des fichiers d'état quand plusieurs bots partagent le processus
+        suffix = f".{key}" if key else ""
+        state_root, state_ext = os.path.splitext(STATE_FILE)
+        self.state_file = f"{state_root}{suffix}{state_ext}"
+        self.timestamp_file = f".last_prediction_time{suffix}"
         self.predictions = {}  # Store predictions for verification
         self.processed_messages = set()  # Avoid duplicate processing
         self.sent_predictions = {}  # Store sent prediction messages for editing
@@ -40,12 +50,40 @@ class CardPredictor:
         self.redirect_channels = {}  # Store redirection channels for different chats
         self.last_prediction_time = self._load_last_prediction_time()  # Load persisted timestamp
         self.prediction_cooldown = 30   # Cooldown period in seconds between predictions
+        self.load_state()
+
+    def save_state(self, path: Optional[str] = None):
+        """Persist pending predictions and sent message references"""
+        path = path or self.state_file
+        state = {
+            'predictions': self.predictions,
+            'sent_predictions': self.sent_predictions,
+            'redirect_channels': self.redirect_channels,
+            'position_preference': self.position_preference,
+        }
+        fastjson.dump_file(state, path)
+        logger.info(f"💾 PERSISTANCE - État sauvegardé: {len(self.predictions)} prédictions, {len(self.sent_predictions)} messages")
+
+    def load_state(self, path: Optional[str] = None):
+        """Reload the snapshot written by save_state (JSON keys are strings)"""
+        path = path or self.state_file
+        try:
+            if not os.path.exists(path):
+                return
+            state = fastjson.load_file(path)
+            self.predictions = {int(k): v for k, v in state.get('predictions', {}).items()}
+            self.sent_predictions = {int(k): v for k, v in state.get('sent_predictions', {}).items()}
+            self.redirect_channels = {int(k): v for k, v in state.get('redirect_channels', {}).items()}
+            self.position_preference = state.get('position_preference', self.position_preference)
+            logger.info(f"⏰ PERSISTANCE - État restauré: {len(self.predictions)} prédictions, {len(self.sent_predictions)} messages")
+        except Exception as e:
+            logger.warning(f"⚠️ Impossible de charger l'état des prédictions: {e}")
 
     def _load_last_prediction_time(self) -> float:
         """Load last prediction timestamp from file"""
         try:
-            if os.path.exists('.last_prediction_time'):
-                with open('.last_prediction_time', 'r') as f:
+            if os.path.exists(self.timestamp_file):
+                with open(self.timestamp_file, 'r') as f:
                     timestamp = float(f.read().strip())
                     logger.info(f"⏰ PERSISTANCE - Dernière prédiction chargée: {time.time() - timestamp:.1f}s écoulées")
                     return timestamp
@@ -56,11 +94,15 @@ class CardPredictor:
     def _save_last_prediction_time(self):
         """Save last prediction timestamp to file"""
         try:
-            with open('.last_prediction_time', 'w') as f:
+            with open(self.timestamp_file, 'w') as f:
                 f.write(str(self.last_prediction_time))
         except Exception as e:
             logger.warning(f"⚠️ Impossible de sauvegarder le timestamp: {e}")
 
+    def pending_count(self) -> int:
+        """Number of predictions still waiting for verification"""
+        return sum(1 for prediction in list(self.predictions.values()) if prediction.get('status') == 'pending')
+
     def reset_predictions(self):
         """Reset all prediction states - useful for recalibration"""
         self.predictions.clear()
@@ -364,6 +406,7 @@ class CardPredictor:
             # Prevent duplicate processing
             message_hash = hash(message)
             if message_hash not in self.processed_messages:
+                DEDUP_LOOKUPS.inc(result='miss')
                 self.processed_messages.add(message_hash)
                 # Mettre à jour le timestamp de la dernière prédiction et sauvegarder
                 self.last_prediction_time = time.time()
@@ -372,6 +415,7 @@ class CardPredictor:
                 logger.info(f"⏰ COOLDOWN - Prochaine prédiction possible dans {self.prediction_cooldown}s")
                 return True, game_number, predicted_costume
             else:
+                DEDUP_LOOKUPS.inc(result='hit')
                 logger.info(f"🔮 PRÉDICTION - Jeu {game_number}: ⚠️ Déjà traité")
                 return False, None, None
 
@@ -535,6 +579,7 @@ class CardPredictor:
                     prediction['status'] = 'correct'
                     prediction['verification_count'] = verification_offset
                     prediction['final_message'] = updated_message
+                    VERIFICATIONS.inc(outcome=f'correct_{verification_offset}')
 
                     logger.info(f"🔍 ⚡ SUCCÈS DÉCALAGE +{verification_offset} - Costume {predicted_costume} détecté")
                     logger.info(f"🔍 🛑 ARRÊT IMMÉDIAT - Vérification terminée: {status_symbol}")
@@ -561,6 +606,7 @@ class CardPredictor:
                 # Marquer comme échec APRÈS +2
                 prediction['status'] = 'failed'
                 prediction['final_message'] = updated_message
+                VERIFICATIONS.inc(outcome='failed')
 
                 logger.info(f"🔍 ❌ ÉCHEC APRÈS +2 - Décalage {verification_offset} ≥ 2")
                 logger.info(f"🔍 🛑 ARRÊT ÉCHEC - Prédiction {predicted_game} marquée: ⭕")
@@ -0,0 +1,57 @@
+"""
+Time sources for the prediction scheduler.
+
+PredictionScheduler reads the time only through its clock, so the simulation
+driver can swap the wall clock for a virtual one and replay days of schedule
+in a fraction of a second.
+
+now() is the wall clock, used for stored timestamps and display. monotonic()
+never jumps and is what the scheduler times its launches against, so an NTP
+step, a manual clock change or a DST transition cannot fire launches in a
+burst or skip them.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class SystemClock:
+    """Wall-clock time plus the process monotonic clock"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+class VirtualClock:
+    """Manually advanced time for simulations"""
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._now = start or datetime.now().replace(microsecond=0)
+        # Temps écoulé en timedelta (exact à la microseconde, sans dérive flottante)
+        self._elapsed = timedelta(0)
+
+    def now(self) -> datetime:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._elapsed.total_seconds()
+
+    def advance(self, seconds: float) -> datetime:
+        step = timedelta(seconds=seconds)
+        self._now += step
+        self._elapsed += step
+        return self._now
+
+    def advance_to(self, moment: datetime) -> datetime:
+        """Move forward to `moment` (never backwards)"""
+        if moment > self._now:
+            self.advance((moment - self._now).total_seconds())
+        return self._now
+
+    def step_wall(self, seconds: float) -> datetime:
+        """Step the wall clock only (NTP correction, manual change); monotonic time is unchanged"""
+        self._now += timedelta(seconds=seconds)
+        return self._now
@@ -3,16 +3,23 @@ Configuration settings for the Telegram bot
 """
 import os
 import logging
+from typing import Any, Dict
 
 logger = logging.getLogger(__name__)
 
+# Clé du bot historique configuré par BOT_TOKEN, servi sur /webhook (réservée dans BOT_TOKENS)
+DEFAULT_BOT_KEY = 'default'
+
 class Config:
     """Configuration class for bot settings"""
     
     def __init__(self):
-        # BOT_TOKEN - OBLIGATOIRE depuis variable d'environnement
+        # BOT_TOKENS - mode multi-bots: "clé=token[@canal_source],clé2=token2"
+        self.BOTS = self._parse_bot_tokens(os.getenv('BOT_TOKENS', ''))
+
+        # BOT_TOKEN - OBLIGATOIRE depuis variable d'environnement (sauf si BOT_TOKENS est défini)
         self.BOT_TOKEN = os.getenv('BOT_TOKEN')
-        if not self.BOT_TOKEN:
+        if not self.BOT_TOKEN and not self.BOTS:
             raise ValueError("BOT_TOKEN environment variable is required")
         
         # Auto-génération URL pour Replit
@@ -35,6 +42,26 @@ class Config:
         # Validate configuration
         self._validate_config()
     
+    @staticmethod
+    def _parse_bot_tokens(raw: str) -> Dict[str, Dict[str, Any]]:
+        """Parse BOT_TOKENS into {key: {'token': ..., 'source_channel_id': ...}}"""
+        bots = {}
+        for entry in filter(None, (part.strip() for part in raw.split(','))):
+            key, sep, value = entry.partition('=')
+            if not sep or not key or not value:
+                raise ValueError(f"Entrée BOT_TOKENS invalide: {entry!r} (attendu clé=token[@canal])")
+            key = key.strip()
+            if key == DEFAULT_BOT_KEY:
+                raise ValueError(f"Clé BOT_TOKENS réservée: {key!r} désigne le bot de BOT_TOKEN, choisissez une autre clé")
+            if key in bots:
+                raise ValueError(f"Clé BOT_TOKENS en double: {key!r}")
+            token, _, channel = value.partition('@')
+            bots[key] = {
+                'token': token.strip(),
+                'source_channel_id': int(channel) if channel else None
+            }
+        return bots
+
     def _get_bot_token(self) -> str:
         """Get bot token from environment variables only"""
         token = os.getenv('BOT_TOKEN', os.getenv('TELEGRAM_BOT_TOKEN', ''))
@@ -46,11 +73,15 @@ class Config:
     
     def _validate_config(self) -> None:
         """Validate configuration settings"""
-        if not self.BOT_TOKEN:
+        if not self.BOT_TOKEN and not self.BOTS:
             raise ValueError("Bot token is required")
         
-        if len(self.BOT_TOKEN.split(':')) != 2:
-            raise ValueError("Invalid bot token format")
+        tokens = [bot['token'] for bot in self.BOTS.values()]
+        if self.BOT_TOKEN:
+            tokens.append(self.BOT_TOKEN)
+        for token in tokens:
+            if len(token.split(':')) != 2:
+                raise ValueError("Invalid bot token format")
         
         if self.WEBHOOK_URL and not self.WEBHOOK_URL.startswith('https://'):
             logger.warning("Webhook URL should use HTTPS for production")
@@ -65,4 +96,4 @@ class Config:
     
     def __str__(self) -> str:
         """String representation of config (without sensitive data)"""
-        return f"Config(webhook_url={self.WEBHOOK_URL}, port={self.PORT}, debug={self.DEBUG})"
+        return f"Config(webhook_url={self.WEBHOOK_URL}, port={self.PORT}, debug={self.DEBUG}, bots={list(self.BOTS)})"
@@ -0,0 +1,94 @@
+"""
+Thread-safe PostgreSQL connection pool for DatabaseManager.
+
+Connections are opened once and reused, so a query on a warm pool costs a
+round trip instead of a TCP + TLS + auth handshake. Checkout blocks while
+the pool is exhausted, connections idle for a while are pinged before being
+handed out, and broken connections are discarded and replaced.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+# Une connexion inactive depuis plus longtemps est vérifiée (SELECT 1) avant usage
+IDLE_CHECK_SECONDS = float(os.getenv('DB_POOL_IDLE_CHECK', '30'))
+CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+
+# Erreurs signalant une connexion inutilisable (réseau, serveur redémarré)
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class ConnectionPool:
+    """Bounded pool with blocking checkout, health checks and reconnect"""
+
+    def __init__(self, dsn: str, minconn: int = POOL_MIN, maxconn: int = POOL_MAX,
+                 idle_check: float = IDLE_CHECK_SECONDS, timeout: float = CHECKOUT_TIMEOUT):
+        self.maxconn = maxconn
+        self.idle_check = idle_check
+        self.timeout = timeout
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # Dernier retour au pool par connexion (monotonic)
+        self._last_used: Dict[int, float] = {}
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0.0) < self.idle_check:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def _discard(self, conn) -> None:
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"aucune connexion libre après {self.timeout}s ({self.maxconn} en cours)")
+        try:
+            # Les connexions mortes sont écartées ; getconn en ouvre une neuve quand le pool est vide
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._healthy(conn):
+                    return conn
+                self._discard(conn)
+            raise psycopg2.OperationalError("impossible d'obtenir une connexion saine")
+        except Exception:
+            self._slots.release()
+            raise
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for one transaction (commit on success, rollback on error)"""
+        conn = self._checkout()
+        broken = False
+        try:
+            with conn:
+                yield conn
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            if broken or conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+            self._slots.release()
+
+    def close(self) -> None:
+        self._pool.closeall()
+        self._last_used.clear()
@@ -0,0 +1,56 @@
+"""
+JSON encoding/decoding for the hot path.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both paths produce compact UTF-8 and accept int dict keys.
+"""
+import os
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        """Decode JSON from bytes or str"""
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """Encode to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=_OPTIONS)
+else:
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        """Decode JSON from bytes or str"""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """Encode to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode to a compact JSON str"""
+    return dumps(obj).decode('utf-8')
+
+
+def load_file(path: str) -> Any:
+    """Read and decode a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(obj: Any, path: str) -> None:
+    """Write a JSON file atomically (temporary file then rename)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(obj))
+    os.replace(tmp_path, path)
@@ -6,7 +6,8 @@ import logging
 import os
 from datetime import datetime, timedelta
 from collections import defaultdict
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from outbound import OutboundScheduler, outbound as shared_outbound
 
 logger = logging.getLogger(__name__)
 
@@ -151,17 +152,25 @@ def is_rate_limited(user_id: int) -> bool:
 class TelegramHandlers:
     """Handlers for Telegram bot using webhook approach"""
 
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, card_predictor=None, source_channel_id: int = TARGET_CHANNEL_ID,
+                 outbound: Optional[OutboundScheduler] = None):
         self.bot_token = bot_token
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
         self.deployment_file_path = "deploo299999_final_complete.zip"
-        # Import card_predictor locally to avoid circular imports
-        try:
-            from card_predictor import card_predictor
+        # Canal source surveillé (un par bot en mode multi-bots)
+        self.source_channel_id = source_channel_id
+        # Pool HTTP et file d'envoi partagés entre tous les bots du processus
+        self.outbound = outbound or shared_outbound
+        if card_predictor is not None:
             self.card_predictor = card_predictor
-        except ImportError:
-            logger.error("Failed to import card_predictor")
-            self.card_predictor = None
+        else:
+            # Import card_predictor locally to avoid circular imports
+            try:
+                from card_predictor import card_predictor
+                self.card_predictor = card_predictor
+            except ImportError:
+                logger.error("Failed to import card_predictor")
+                self.card_predictor = None
 
         # Store redirected channels for each source chat
         self.redirected_channels = {} # {source_chat_id: target_chat_id}
@@ -272,11 +281,11 @@ class TelegramHandlers:
                     return
 
                 # Vérifier que c'est du canal autorisé
-                if sender_chat_id != TARGET_CHANNEL_ID:
+                if sender_chat_id != self.source_channel_id:
                     logger.info(f"🚫 Message édité ignoré - Canal non autorisé: {sender_chat_id}")
                     return
 
-                logger.info(f"✅ WEBHOOK - Message édité du canal autorisé: {TARGET_CHANNEL_ID}")
+                logger.info(f"✅ WEBHOOK - Message édité du canal autorisé: {self.source_channel_id}")
 
                 # TRAITEMENT MESSAGES ÉDITÉS AMÉLIORÉ - Prédiction ET Vérification
                 has_completion = self.card_predictor.has_completion_indicators(text)
@@ -359,8 +368,8 @@ class TelegramHandlers:
             sender_chat_id = sender_chat.get('id', chat_id) # If sender_chat is missing, assume it's the chat itself
 
             # Only process messages from Baccarat Kouamé channel
-            if sender_chat_id != TARGET_CHANNEL_ID:
-                logger.info(f"🚫 Message ignoré - Canal non autorisé: {sender_chat_id} (attendu: {TARGET_CHANNEL_ID})")
+            if sender_chat_id != self.source_channel_id:
+                logger.info(f"🚫 Message ignoré - Canal non autorisé: {sender_chat_id} (attendu: {self.source_channel_id})")
                 return
 
             if not text or not self.card_predictor:
@@ -423,7 +432,7 @@ class TelegramHandlers:
             sender_chat_id = sender_chat.get('id', chat_id)
 
             # Only process messages from Baccarat Kouamé channel
-            if sender_chat_id != TARGET_CHANNEL_ID:
+            if sender_chat_id != self.source_channel_id:
                 return
 
             if not text or not self.card_predictor:
@@ -1215,17 +1224,13 @@ class TelegramHandlers:
     def send_message(self, chat_id: int, text: str) -> Any: # Changed return type to Any to match potential dict return
         """Send text message to user"""
         try:
-            import requests
-
-            url = f"{self.base_url}/sendMessage"
             data = {
                 'chat_id': chat_id,
                 'text': text,
                 'parse_mode': 'HTML'
             }
 
-            response = requests.post(url, json=data, timeout=10)
-            result = response.json()
+            result = self.outbound.call(self.bot_token, 'sendMessage', json=data, timeout=10)
 
             if result.get('ok'):
                 logger.info(f"Message sent successfully to chat {chat_id}")
@@ -1241,10 +1246,6 @@ class TelegramHandlers:
     def send_document(self, chat_id: int, file_path: str) -> bool:
         """Send document file to user"""
         try:
-            import requests
-
-            url = f"{self.base_url}/sendDocument"
-
             with open(file_path, 'rb') as file:
                 files = {
                     'document': (os.path.basename(file_path), file, 'application/zip')
@@ -1254,8 +1255,7 @@ class TelegramHandlers:
                     'caption': '📦 Package de déploiement pour render.com\n\n🎯 Tout est inclus pour déployer votre bot !'
                 }
 
-                response = requests.post(url, data=data, files=files, timeout=60)
-                result = response.json()
+                result = self.outbound.call(self.bot_token, 'sendDocument', data=data, files=files, timeout=60)
 
                 if result.get('ok'):
                     logger.info(f"Document sent successfully to chat {chat_id}")
@@ -1274,9 +1274,6 @@ class TelegramHandlers:
     def edit_message(self, chat_id: int, message_id: int, new_text: str) -> bool:
         """Edit an existing message"""
         try:
-            import requests
-
-            url = f"{self.base_url}/editMessageText"
             data = {
                 'chat_id': chat_id,
                 'message_id': message_id,
@@ -1284,8 +1281,7 @@ class TelegramHandlers:
                 'parse_mode': 'HTML'
             }
 
-            response = requests.post(url, json=data, timeout=10)
-            result = response.json()
+            result = self.outbound.call(self.bot_token, 'editMessageText', json=data, timeout=10)
 
             if result.get('ok'):
                 logger.info(f"Message edited successfully in chat {chat_id}")
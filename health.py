@@ -0,0 +1,87 @@
+"""
+Readiness probe: reports processing lag and send backlog, and fails when a
+threshold is exceeded so the platform restarts a wedged instance.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Seuils (secondes / nombre). 0 désactive le contrôle correspondant.
+# L'âge du dernier update est désactivé par défaut : un canal calme n'est pas une panne.
+MAX_UPDATE_AGE = float(os.getenv('READY_MAX_UPDATE_AGE', '0'))
+MAX_QUEUE_DEPTH = int(os.getenv('READY_MAX_QUEUE_DEPTH', '100'))
+MAX_SEND_AGE = float(os.getenv('READY_MAX_SEND_AGE', '90'))
+MAX_LOOP_LAG = float(os.getenv('READY_MAX_LOOP_LAG', '5'))
+
+
+class ReadinessProbe:
+    """Collects liveness signals and evaluates them against thresholds"""
+
+    def __init__(self,
+                 queue_depth: Optional[Callable[[], int]] = None,
+                 oldest_send_age: Optional[Callable[[], float]] = None,
+                 max_update_age: float = MAX_UPDATE_AGE,
+                 max_queue_depth: int = MAX_QUEUE_DEPTH,
+                 max_send_age: float = MAX_SEND_AGE,
+                 max_loop_lag: float = MAX_LOOP_LAG):
+        self.queue_depth = queue_depth
+        self.oldest_send_age = oldest_send_age
+        self.max_update_age = max_update_age
+        self.max_queue_depth = max_queue_depth
+        self.max_send_age = max_send_age
+        self.max_loop_lag = max_loop_lag
+        self.started_at = time.monotonic()
+        self.last_update_at: Optional[float] = None
+        # Retards mesurés récemment ; on expose le pire pour ne pas masquer un blocage bref
+        self._lag_samples: deque = deque()
+
+    @property
+    def loop_lag(self) -> Optional[float]:
+        return max(self._lag_samples) if self._lag_samples else None
+
+    def mark_update_processed(self) -> None:
+        self.last_update_at = time.monotonic()
+
+    async def monitor_loop_lag(self, interval: float = 1.0, window: float = 30.0) -> None:
+        """Measure how late the event loop wakes a sleeping task (run as a background task)"""
+        self._lag_samples = deque(maxlen=max(1, int(window / interval)))
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            self._lag_samples.append(max(0.0, time.monotonic() - expected))
+
+    def check(self) -> Tuple[bool, Dict[str, Any]]:
+        """Return (ready, report)"""
+        now = time.monotonic()
+        failures = []
+        report: Dict[str, Any] = {'uptime_seconds': round(now - self.started_at, 1)}
+
+        # Depuis le démarrage si aucun update n'a encore été traité
+        update_age = now - (self.last_update_at or self.started_at)
+        report['last_update_age_seconds'] = round(update_age, 1)
+        if self.max_update_age and update_age > self.max_update_age:
+            failures.append('last_update_age')
+
+        if self.queue_depth is not None:
+            depth = self.queue_depth()
+            report['outbound_queue_depth'] = depth
+            if self.max_queue_depth and depth > self.max_queue_depth:
+                failures.append('outbound_queue_depth')
+
+        if self.oldest_send_age is not None:
+            send_age = self.oldest_send_age()
+            report['oldest_pending_send_seconds'] = round(send_age, 1)
+            if self.max_send_age and send_age > self.max_send_age:
+                failures.append('oldest_pending_send')
+
+        if self.loop_lag is not None:
+            report['event_loop_lag_seconds'] = round(self.loop_lag, 3)
+            if self.max_loop_lag and self.loop_lag > self.max_loop_lag:
+                failures.append('event_loop_lag')
+
+        report['status'] = 'ready' if not failures else 'unhealthy'
+        if failures:
+            report['failed_checks'] = failures
+        return not failures, report
@@ -0,0 +1,133 @@
+"""
+Leader election for the automatic prediction scheduler.
+
+When several instances of mainkk.py run side by side, only the holder of the
+scheduler lock launches predictions and edits their messages. With a database
+the lock is a PostgreSQL session advisory lock; otherwise an exclusive flock
+on a local file (single host). Both are released by the server or the kernel
+as soon as the holding process dies, so a standby can take over on its next
+attempt. If the whole host dies, TCP keepalives on the lock session (see
+models.LOCK_KEEPALIVE_*) let PostgreSQL drop it within about ten seconds
+instead of the system TCP timeout.
+"""
+import os
+import zlib
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Clé du verrou consultatif partagée par toutes les instances
+LOCK_NAME = os.getenv('SCHEDULER_LOCK_NAME', 'prediction_scheduler')
+LOCK_FILE = os.getenv('SCHEDULER_LOCK_FILE', 'scheduler.lock')
+
+# Intervalle entre deux tentatives d'une instance en attente / deux contrôles du leader
+RETRY_SECONDS = float(os.getenv('SCHEDULER_LEADER_RETRY', '5'))
+
+
+class LeaderLock:
+    """Interface: acquire without blocking, check, release"""
+
+    held = False
+
+    def try_acquire(self) -> bool:
+        raise NotImplementedError
+
+    def still_held(self) -> bool:
+        return self.held
+
+    def release(self) -> None:
+        self.held = False
+
+
+class PostgresLeaderLock(LeaderLock):
+    """pg_try_advisory_lock on a dedicated connection kept open while leading"""
+
+    def __init__(self, db, name: str = LOCK_NAME):
+        self.db = db
+        self.key = zlib.crc32(name.encode('utf-8'))
+        self._conn = None
+
+    def try_acquire(self) -> bool:
+        if self.held:
+            return True
+        self._conn = self.db.acquire_advisory_lock(self.key)
+        self.held = self._conn is not None
+        return self.held
+
+    def still_held(self) -> bool:
+        """The lock lives as long as its session; a dead connection means it is gone"""
+        if not self.held:
+            return False
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except Exception:
+            self._close()
+            return False
+
+    def release(self) -> None:
+        if self.held:
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+            except Exception:
+                pass
+        self._close()
+
+    def _close(self) -> None:
+        self.held = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+class FileLeaderLock(LeaderLock):
+    """Exclusive non-blocking flock on a local file"""
+
+    def __init__(self, path: str = LOCK_FILE):
+        self.path = path
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        if self.held:
+            return True
+        if fcntl is None:
+            # Pas de flock : une seule instance supposée
+            self.held = True
+            return True
+        f = open(self.path, 'a+')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        self.held = True
+        return True
+
+    def release(self) -> None:
+        self.held = False
+        if self._file is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._file.close()
+                self._file = None
+
+
+def make_leader_lock(db=None, name: str = LOCK_NAME, path: Optional[str] = None) -> LeaderLock:
+    """Advisory lock when a PostgreSQL database is configured, file lock otherwise (SQLite, JSON)"""
+    if db is not None and hasattr(db, 'acquire_advisory_lock'):
+        return PostgresLeaderLock(db, name)
+    return FileLeaderLock(path or LOCK_FILE)
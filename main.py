@@ -2,10 +2,17 @@
 Main entry point for the Telegram bot deployment on render.com
 """
 import os
+import time
 import logging
-from flask import Flask, request
+from typing import Dict
+from flask import Flask, Response, request
 from bot import TelegramBot
-from config import Config
+from config import Config, DEFAULT_BOT_KEY
+import fastjson
+from metrics import REGISTRY, CONTENT_TYPE, UPDATES_RECEIVED, STAGE_LATENCY, PENDING_PREDICTIONS
+from shutdown import ShutdownCoordinator
+from outbound import outbound
+from health import ReadinessProbe
 
 # Configure logging
 logging.basicConfig(
@@ -17,39 +24,88 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 
-# Initialize bot
+# Initialize bots - un processus, un pool HTTP et une file d'envoi pour tous les bots
 config = Config()
-bot = TelegramBot(config.BOT_TOKEN)
+bots: Dict[str, TelegramBot] = {}
+if config.BOT_TOKEN:
+    bots[DEFAULT_BOT_KEY] = TelegramBot(config.BOT_TOKEN)
+for bot_key, bot_spec in config.BOTS.items():
+    bots[bot_key] = TelegramBot(bot_spec['token'], key=bot_key, source_channel_id=bot_spec['source_channel_id'])
+bot = bots.get(DEFAULT_BOT_KEY)
+logger.info(f"🤖 {len(bots)} bot(s) hébergé(s): {', '.join(bots)}")
+
+PENDING_PREDICTIONS.set_function(lambda: sum(b.card_predictor.pending_count() for b in bots.values()))
+
+# Drain des requêtes en cours et sauvegarde de l'état au SIGTERM (déploiements Render)
+shutdown = ShutdownCoordinator()
+for bot_key, hosted_bot in bots.items():
+    shutdown.register(f'card_predictor[{bot_key}]', hosted_bot.card_predictor.save_state)
+shutdown.install()
+
+# Readiness : âge du dernier update traité, file d'envoi et envoi le plus ancien
+readiness = ReadinessProbe(queue_depth=outbound.depth, oldest_send_age=outbound.oldest_pending_age)
 
 @app.route('/webhook', methods=['POST'])
-def webhook():
+@app.route('/webhook/<bot_key>', methods=['POST'])
+def webhook(bot_key: str = DEFAULT_BOT_KEY):
     """Handle incoming webhook from Telegram"""
+    target_bot = bots.get(bot_key)
+    if target_bot is None:
+        return 'Unknown bot', 404
+
+    if shutdown.draining:
+        # Telegram renverra l'update, qui sera traité par la nouvelle instance
+        return 'Shutting down', 503
+
+    started = time.perf_counter()
     try:
-        update = request.get_json()
+        with STAGE_LATENCY.time(stage='decode'):
+            update = fastjson.loads(request.get_data(cache=False))
         
         # Log type de message reçu
         if 'message' in update:
+            UPDATES_RECEIVED.inc(type='message')
             logger.info(f"📨 Webhook - Message normal reçu")
         elif 'edited_message' in update:
+            UPDATES_RECEIVED.inc(type='edited_message')
             logger.info(f"✏️ Webhook - Message édité reçu")
+        else:
+            UPDATES_RECEIVED.inc(type='other')
         
-        logger.info(f"Webhook received update: {update}")
+        logger.debug("Webhook received update_id=%s", update.get('update_id'))
         
         if update:
             # Traitement direct pour meilleure réactivité
-            bot.handle_update(update)
+            with shutdown.track():
+                target_bot.handle_update(update)
+            readiness.mark_update_processed()
             logger.info("Update processed successfully")
         
         return 'OK', 200
     except Exception as e:
         logger.error(f"Error handling webhook: {e}")
         return 'Error', 500
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage='total')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for render.com"""
     return {'status': 'healthy', 'service': 'telegram-bot'}, 200
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint - 503 when processing is stuck or draining"""
+    ready, report = readiness.check()
+    if shutdown.draining:
+        ready, report['status'] = False, 'draining'
+    return report, 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def home():
     """Root endpoint"""
@@ -61,16 +117,20 @@ def setup_webhook():
         # Utiliser l'URL configurée dans Config
         webhook_url = config.WEBHOOK_URL
         if webhook_url and webhook_url != "https://.repl.co":
-            full_webhook_url = f"{webhook_url}/webhook"
-            logger.info(f"🔗 Configuration webhook: {full_webhook_url}")
-            
-            # Configure webhook for Render.com with your specific URL
-            success = bot.set_webhook(full_webhook_url)
-            if success:
-                logger.info(f"✅ Webhook configuré avec succès: {full_webhook_url}")
-                logger.info(f"🎯 Bot prêt pour prédictions automatiques et vérifications via webhook")
-            else:
-                logger.error("❌ Échec configuration webhook")
+            for bot_key, hosted_bot in bots.items():
+                if bot_key == DEFAULT_BOT_KEY:
+                    full_webhook_url = f"{webhook_url}/webhook"
+                else:
+                    full_webhook_url = f"{webhook_url}/webhook/{bot_key}"
+                logger.info(f"🔗 Configuration webhook: {full_webhook_url}")
+                
+                # Configure webhook for Render.com with your specific URL
+                success = hosted_bot.set_webhook(full_webhook_url)
+                if success:
+                    logger.info(f"✅ Webhook configuré avec succès: {full_webhook_url}")
+                    logger.info(f"🎯 Bot {bot_key} prêt pour prédictions automatiques et vérifications via webhook")
+                else:
+                    logger.error(f"❌ Échec configuration webhook pour {bot_key}")
         else:
             logger.warning("⚠️ WEBHOOK_URL non configurée, mode polling recommandé pour le développement")
             logger.info("💡 Pour activer le webhook, configurez la variable WEBHOOK_URL")
@@ -1,17 +1,27 @@
 import os
 import asyncio
 import re
+import copy
 import json
+import fastjson
 import zipfile
 import tempfile
 import shutil
 from datetime import datetime
+from typing import Optional
 from telethon import TelegramClient, events
 from telethon.events import ChatAction
 from dotenv import load_dotenv
 from predictor import CardPredictor
 from scheduler import PredictionScheduler
-from models import init_database, db
+from schedule_store import ScheduleArchive, make_schedule_store
+from schedule_rules import compile_rules
+from leader import make_leader_lock
+from models import init_database
+from async_db import AsyncDatabase
+from write_behind import WriteBehindBuffer
+from shutdown import ShutdownCoordinator
+from health import ReadinessProbe
 from aiohttp import web
 import threading
 
@@ -42,27 +52,37 @@ except Exception as e:
 
 # Fichier de configuration persistante
 CONFIG_FILE = 'bot_config.json'
+# Instantané des prédictions en cours, écrit à l'arrêt et relu au démarrage
+PREDICTOR_STATE_FILE = 'predictor_state.json'
+# Intervalle entre deux purges de l'historique en base (secondes)
+RETENTION_INTERVAL = float(os.getenv('RETENTION_INTERVAL_HOURS', '6')) * 3600
 
 # Variables d'état
 detected_stat_channel = None
 detected_display_channel = None
 confirmation_pending = {}
 prediction_interval = 5  # Intervalle en minutes avant de chercher "A" (défaut: 5 min)
+schedule_rules = []  # Règles cron du planificateur automatique (voir schedule_rules.py)
 
-def load_config():
+async def load_config():
     """Load configuration from database"""
-    global detected_stat_channel, detected_display_channel, prediction_interval
+    global detected_stat_channel, detected_display_channel, prediction_interval, schedule_rules
     try:
-        if db:
-            detected_stat_channel = db.get_config('stat_channel')
-            detected_display_channel = db.get_config('display_channel')
-            interval_config = db.get_config('prediction_interval')
+        if adb:
+            # Lectures indépendantes: exécutées en parallèle hors de la boucle d'événements
+            detected_stat_channel, detected_display_channel, interval_config, rules_config = await asyncio.gather(
+                adb.get_config('stat_channel'),
+                adb.get_config('display_channel'),
+                adb.get_config('prediction_interval'),
+                adb.get_config('schedule_rules'),
+            )
             if detected_stat_channel:
                 detected_stat_channel = int(detected_stat_channel)
             if detected_display_channel:
                 detected_display_channel = int(detected_display_channel)
             if interval_config:
                 prediction_interval = int(interval_config)
+            schedule_rules = rules_config or []
             print(f"✅ Configuration chargée depuis la DB: Stats={detected_stat_channel}, Display={detected_display_channel}, Intervalle={prediction_interval}min")
         else:
             # Fallback vers l'ancien système JSON si DB non disponible
@@ -72,27 +92,32 @@ def load_config():
                     detected_stat_channel = config.get('stat_channel')
                     detected_display_channel = config.get('display_channel')
                     prediction_interval = config.get('prediction_interval', 5)
+                    schedule_rules = config.get('schedule_rules', [])
                     print(f"✅ Configuration chargée depuis JSON: Stats={detected_stat_channel}, Display={detected_display_channel}, Intervalle={prediction_interval}min")
             else:
                 print("ℹ️ Aucune configuration trouvée, nouvelle configuration")
     except Exception as e:
         print(f"⚠️ Erreur chargement configuration: {e}")
 
-def save_config():
+async def save_config():
     """Save configuration to database and JSON backup"""
     try:
-        if db:
-            # Sauvegarde en base de données
-            db.set_config('stat_channel', detected_stat_channel)
-            db.set_config('display_channel', detected_display_channel)
-            db.set_config('prediction_interval', prediction_interval)
+        if adb:
+            # Sauvegarde en base de données, sans bloquer la boucle d'événements
+            await asyncio.gather(
+                adb.set_config('stat_channel', detected_stat_channel),
+                adb.set_config('display_channel', detected_display_channel),
+                adb.set_config('prediction_interval', prediction_interval),
+                adb.set_config('schedule_rules', schedule_rules),
+            )
             print("💾 Configuration sauvegardée en base de données")
 
         # Sauvegarde JSON de secours
         config = {
             'stat_channel': detected_stat_channel,
             'display_channel': detected_display_channel,
-            'prediction_interval': prediction_interval
+            'prediction_interval': prediction_interval,
+            'schedule_rules': schedule_rules
         }
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=2)
@@ -100,15 +125,73 @@ def save_config():
     except Exception as e:
         print(f"❌ Erreur sauvegarde configuration: {e}")
 
-def update_channel_config(source_id: int, target_id: int):
+def snapshot_predictor_state():
+    """Copy of the predictor state, taken on the event loop before the shutdown hooks run"""
+    return copy.deepcopy({
+        'prediction_status': predictor.prediction_status,
+        'prediction_messages': predictor.prediction_messages,
+        'last_predictions': predictor.last_predictions,
+        'status_log': predictor.status_log,
+    })
+
+def save_predictor_state(state):
+    """Save pending predictions and their message IDs so a restart can still edit them"""
+    fastjson.dump_file(state, PREDICTOR_STATE_FILE)
+    print(f"💾 État du prédicteur sauvegardé: {len(state['prediction_status'])} prédictions")
+
+def load_predictor_state():
+    """Restore the snapshot written by save_predictor_state"""
+    try:
+        if not os.path.exists(PREDICTOR_STATE_FILE):
+            return
+        state = fastjson.load_file(PREDICTOR_STATE_FILE)
+        predictor.prediction_status.update({int(k): v for k, v in state.get('prediction_status', {}).items()})
+        predictor.prediction_messages.update({int(k): v for k, v in state.get('prediction_messages', {}).items()})
+        predictor.last_predictions.extend(tuple(item) for item in state.get('last_predictions', []))
+        predictor.status_log.extend(tuple(item) for item in state.get('status_log', []))
+        print(f"✅ État du prédicteur restauré: {len(predictor.prediction_status)} prédictions")
+    except Exception as e:
+        print(f"⚠️ Erreur chargement état du prédicteur: {e}")
+
+def snapshot_scheduler_state():
+    """Copy of the live schedule (leader only), taken on the event loop"""
+    # Une instance en attente ne doit pas écraser l'état écrit par le leader
+    if scheduler and scheduler.is_leader and scheduler.schedule_data:
+        return {numero: dict(data) for numero, data in scheduler.schedule_data.items()}
+    return None
+
+def save_scheduler_state(schedule):
+    """Persist the automatic schedule copied by snapshot_scheduler_state"""
+    if not scheduler:
+        return
+    if schedule:
+        scheduler.save_schedule(schedule)
+    # Écritures de la planification terminées avant la fermeture de la base (hook suivant)
+    scheduler.store.close()
+
+async def retention_loop():
+    """Purge périodique de l'historique (fenêtres MESSAGE_LOG/PREDICTION_RETENTION_DAYS)"""
+    while not shutdown.draining:
+        try:
+            pruned = await adb.prune_history()
+            if any(pruned.values()):
+                print(f"🧹 Rétention: {pruned['messages']} message(s), {pruned['predictions']} prédiction(s) purgé(s)")
+        except Exception as e:
+            print(f"⚠️ Erreur purge de l'historique: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+async def update_channel_config(source_id: int, target_id: int):
     """Update channel configuration"""
     global detected_stat_channel, detected_display_channel
     detected_stat_channel = source_id
     detected_display_channel = target_id
-    save_config()
+    await save_config()
 
 # Initialize database
 database = init_database()
+# Accès asynchrone (thread dédié) pour les handlers Telethon
+# Écritures de prédictions différées et groupées ; adb.close() vide le tampon avant de fermer la base
+adb = AsyncDatabase(WriteBehindBuffer(database)) if database else None
 
 # Gestionnaire de prédictions
 predictor = CardPredictor()
@@ -116,6 +199,16 @@ predictor = CardPredictor()
 # Planificateur automatique
 scheduler = None
 
+# Arrêt gracieux : drain des envois/éditions puis sauvegarde de l'état
+shutdown = ShutdownCoordinator()
+shutdown.register('predictor', save_predictor_state, snapshot=snapshot_predictor_state)
+shutdown.register('scheduler', save_scheduler_state, snapshot=snapshot_scheduler_state)
+if adb:
+    shutdown.register('database', adb.close)
+
+# Readiness : traitements en cours, retard de la boucle asyncio, dernier message traité
+readiness = ReadinessProbe(queue_depth=lambda: shutdown.inflight)
+
 # Initialize Telegram client with memory session (no disk storage)
 from telethon.sessions import MemorySession
 client = TelegramClient(MemorySession(), API_ID, API_HASH)
@@ -124,7 +217,8 @@ async def start_bot():
     """Start the bot with proper error handling"""
     try:
         # Load saved configuration first
-        load_config()
+        await load_config()
+        load_predictor_state()
 
         await client.start(bot_token=BOT_TOKEN)
         print("Bot démarré avec succès...")
@@ -216,7 +310,7 @@ async def set_stat_channel(event):
         confirmation_pending[channel_id] = 'configured_stat'
 
         # Save configuration
-        save_config()
+        await save_config()
 
         try:
             chat = await client.get_entity(channel_id)
@@ -257,7 +351,7 @@ async def set_display_channel(event):
         confirmation_pending[channel_id] = 'configured_display'
 
         # Save configuration
-        save_config()
+        await save_config()
 
         try:
             chat = await client.get_entity(channel_id)
@@ -354,7 +448,7 @@ async def reset_bot(event):
         predictor.reset()
 
         # Save the reset configuration
-        save_config()
+        await save_config()
 
         await event.respond("🔄 Bot réinitialisé avec succès\n💾 Configuration effacée et sauvegardée")
         print("Bot réinitialisé par l'administrateur")
@@ -557,6 +651,7 @@ async def force_prediction(event):
 
             # Add to prediction status
             predictor.prediction_status[game_number] = '⌛'
+            await record_prediction(game_number, None, sent_messages)
 
             await event.respond(f"✅ **Prédiction manuelle générée**\n\n🔵{game_number}— 3D🔵 statut :⌛\n\nLa prédiction a été diffusée dans le canal configuré.")
             print(f"✅ Prédiction manuelle générée pour le jeu #{game_number}")
@@ -599,10 +694,20 @@ async def manage_scheduler(event):
         if command == "start":
             if not scheduler:
                 if detected_stat_channel and detected_display_channel:
+                    try:
+                        rules = compile_rules(schedule_rules)
+                    except (KeyError, ValueError) as e:
+                        await event.respond(f"❌ **Règles de planification invalides**\n\n{e}")
+                        return
                     scheduler = PredictionScheduler(
                         client, predictor,
-                        detected_stat_channel, detected_display_channel
+                        detected_stat_channel, detected_display_channel,
+                        archive=ScheduleArchive(database),
+                        leader=make_leader_lock(database),
+                        store=make_schedule_store(database),
+                        rules=rules
                     )
+                    scheduler.work_tracker = shutdown.track
                     # Démarre le planificateur en arrière-plan
                     asyncio.create_task(scheduler.run_scheduler())
                     await event.respond("✅ **Planificateur démarré**\n\nLe système de prédictions automatiques est maintenant actif.")
@@ -625,10 +730,12 @@ async def manage_scheduler(event):
                 status_msg = f"""📊 **Statut du Planificateur**
 
 🔄 **État**: {'🟢 Actif' if status['is_running'] else '🔴 Inactif'}
+👑 **Instance**: {'Leader' if status['is_leader'] else 'En attente (une autre instance lance les prédictions)'}
 📋 **Planification**:
 • Total de prédictions: {status['total']}
 • Prédictions lancées: {status['launched']}
 • Prédictions vérifiées: {status['verified']}
+• Abandonnées: {status['expired']}
 • En attente: {status['pending']}
 
 ⏰ **Prochaine prédiction**: {status['next_launch'] or 'Aucune'}
@@ -641,13 +748,15 @@ async def manage_scheduler(event):
                 await event.respond("ℹ️ **Planificateur non configuré**\n\nUtilisez `/scheduler start` pour l'activer.")
 
         elif command == "generate":
-            if scheduler:
-                scheduler.regenerate_schedule()
+            if scheduler and not scheduler.is_leader:
+                await event.respond("⏸️ **Instance en attente**\n\nLa planification est gérée par l'instance leader.")
+            elif scheduler:
+                await scheduler.regenerate_schedule()
                 await event.respond("🔄 **Nouvelle planification générée**\n\nLa planification quotidienne a été régénérée avec succès.")
             else:
                 # Crée un planificateur temporaire pour générer
                 temp_scheduler = PredictionScheduler(client, predictor, 0, 0)
-                temp_scheduler.regenerate_schedule()
+                await temp_scheduler.regenerate_schedule()
                 await event.respond("✅ **Planification générée**\n\nFichier `prediction.yaml` créé. Utilisez `/scheduler start` pour activer.")
 
         elif command == "config" and len(message_parts) >= 4:
@@ -655,7 +764,7 @@ async def manage_scheduler(event):
             target_id = int(message_parts[3])
 
             # Met à jour la configuration globale
-            update_channel_config(source_id, target_id)
+            await update_channel_config(source_id, target_id)
 
             await event.respond(f"""✅ **Configuration mise à jour**
 
@@ -680,23 +789,14 @@ async def schedule_info(event):
 
         if scheduler and scheduler.schedule_data:
             # Affiche les 10 prochaines prédictions
-            current_time = scheduler.get_current_time_slot()
-            upcoming = []
-
-            for numero, data in scheduler.schedule_data.items():
-                if (not data["launched"] and
-                    data["heure_lancement"] >= current_time):
-                    upcoming.append((numero, data["heure_lancement"]))
-
-            upcoming.sort(key=lambda x: x[1])
-            upcoming = upcoming[:10]  # Limite à 10
+            upcoming = scheduler.upcoming_launches(10, after=scheduler.clock.now())  # Limite à 10 ; horloge du planificateur
 
             msg = "📅 **Prochaines Prédictions Automatiques**\n\n"
-            for numero, heure in upcoming:
-                msg += f"🔵 {numero} → {heure}\n"
+            for numero, launch_at in upcoming:
+                msg += f"🔵 {numero} → {launch_at.strftime('%d/%m %H:%M')}\n"
 
             if not upcoming:
-                msg += "ℹ️ Aucune prédiction en attente pour aujourd'hui."
+                msg += "ℹ️ Aucune prédiction en attente."
 
             await event.respond(msg)
         else:
@@ -745,7 +845,7 @@ Définit le temps d'attente en minutes avant que le système commence à analyse
             prediction_interval = new_interval
 
             # Sauvegarder la configuration
-            save_config()
+            await save_config()
 
             await event.respond(f"""✅ **Intervalle mis à jour**
 
@@ -1065,7 +1165,19 @@ async def generate_complete_deploy_package(event):
                     'main.py',                    # Fichier principal du bot
                     'predictor.py',               # Moteur de prédiction
                     'models.py',                  # Modèles de base de données
+                    'db_pool.py',                 # Pool de connexions PostgreSQL
+                    'async_db.py',                # Accès base non bloquant
+                    'migrations.py',              # Migrations de schéma versionnées
+                    'sqlite_db.py',               # Base SQLite embarquée
+                    'write_behind.py',            # Écritures différées groupées
                     'scheduler.py',               # Système de planification
+                    'schedule_store.py',          # Journal de la planification
+                    'fastjson.py',                # JSON rapide (orjson si disponible)
+                    'shutdown.py',                # Arrêt gracieux
+                    'health.py',                  # Readiness
+                    'leader.py',                  # Élection du planificateur
+                    'schedule_rules.py',          # Règles cron du planificateur
+                    'clock.py',                   # Horloge (réelle / virtuelle)
                     'render_main.py',             # Version optimisée Render
                     'render_predictor.py',        # Predictor pour Render
                     'render_requirements.txt',    # Requirements Render
@@ -1343,6 +1455,18 @@ Le package est maintenant 100% complet et prêt pour déploiement!""")
 @client.on(events.MessageEdited())
 async def handle_messages(event):
     """Handle messages from statistics channel"""
+    # Pendant le drain les messages sont encore traités (Telethon ne les relivrera pas) ;
+    # seuls ceux reçus après la sauvegarde de l'état, avant la déconnexion, sont perdus
+    if shutdown.finished:
+        dropped = shutdown.record_dropped()
+        print(f"⚠️ Arrêt en cours - message ignoré après sauvegarde de l'état ({dropped} au total)")
+        return
+    with shutdown.track():
+        await process_stat_message(event)
+    readiness.mark_update_processed()
+
+async def process_stat_message(event):
+    """Predict, verify and edit from a statistics channel message"""
     try:
         # Debug: Log ALL incoming messages first
         message_text = event.message.message if event.message else "Pas de texte"
@@ -1363,6 +1487,11 @@ async def handle_messages(event):
             print("❌ Message vide ignoré")
             return
 
+        # Doublon (message rejoué, édition sans changement): réponse en mémoire dans la plupart des cas
+        if not await claim_message(message_text, event.chat_id):
+            print(f"🔁 Message déjà traité ignoré: {message_text[:50]}")
+            return
+
         print(f"✅ Message accepté du canal stats {event.chat_id}: {message_text}")
 
         # 1. Vérifier si c'est un message en cours d'édition (⏰ ou 🕐)
@@ -1384,6 +1513,7 @@ async def handle_messages(event):
             if sent_messages and predicted_game:
                 for chat_id, message_id in sent_messages:
                     predictor.store_prediction_message(predicted_game, message_id, chat_id)
+                await record_prediction(predicted_game, suit, sent_messages)
 
             print(f"✅ Prédiction générée après édition finale pour le jeu #{predicted_game}: {suit}")
         else:
@@ -1399,6 +1529,7 @@ async def handle_messages(event):
                 if sent_messages and predicted_game:
                     for chat_id, message_id in sent_messages:
                         predictor.store_prediction_message(predicted_game, message_id, chat_id)
+                    await record_prediction(predicted_game, suit, sent_messages)
 
                 print(f"✅ Prédiction manuelle générée pour le jeu #{predicted_game}: {suit}")
 
@@ -1406,6 +1537,7 @@ async def handle_messages(event):
         verified, number = predictor.verify_prediction(message_text)
         if verified is not None and number is not None:
             statut = predictor.prediction_status.get(number, 'Inconnu')
+            await record_status(number, statut)
             # Edit the original prediction message instead of sending new message
             success = await edit_prediction_message(number, statut)
             if success:
@@ -1420,6 +1552,7 @@ async def handle_messages(event):
         if game_number and not ("⏰" in message_text or "🕐" in message_text):
             expired = predictor.check_expired_predictions(game_number)
             for expired_num in expired:
+                await record_status(expired_num, '❌❌')
                 # Edit expired prediction messages
                 success = await edit_prediction_message(expired_num, '❌❌')
                 if success:
@@ -1429,37 +1562,13 @@ async def handle_messages(event):
                     status_text = f"🔵{expired_num}— JOKER 3D| ❌❌"
                     await broadcast(status_text)
 
-        # Vérification des prédictions automatiques du scheduler
-        if scheduler and scheduler.schedule_data:
-            # Récupère les numéros des prédictions automatiques en attente
-            pending_auto_predictions = []
-            for numero_str, data in scheduler.schedule_data.items():
-                if data["launched"] and not data["verified"]:
-                    numero_int = int(numero_str.replace('N', ''))
-                    pending_auto_predictions.append(numero_int)
-
-            if pending_auto_predictions:
-                # Vérifie si ce message correspond à une prédiction automatique
-                predicted_num, status = scheduler.verify_prediction_from_message(message_text, pending_auto_predictions)
-
-                if predicted_num and status:
-                    # Met à jour la prédiction automatique
-                    numero_str = f"N{predicted_num:03d}"
-                    if numero_str in scheduler.schedule_data:
-                        data = scheduler.schedule_data[numero_str]
-                        data["verified"] = True
-                        data["statut"] = status
-
-                        # Met à jour le message
-                        await scheduler.update_prediction_message(numero_str, data, status)
-
-                        # Ajouter une nouvelle prédiction pour maintenir la continuité
-                        scheduler.add_next_prediction()
-
-                        # Sauvegarde
-                        scheduler.save_schedule(scheduler.schedule_data)
-                        print(f"📝 Prédiction automatique {numero_str} vérifiée: {status}")
-                        print(f"🔄 Nouvelle prédiction générée pour maintenir la continuité")
+        # Vérification des prédictions automatiques du scheduler (une recherche dans l'index)
+        # Seul le leader vérifie et édite les messages des prédictions automatiques
+        if scheduler and scheduler.is_leader and scheduler.schedule_data:
+            result = await scheduler.process_result(message_text)
+            if result:
+                numero_str, status = result
+                print(f"📝 Prédiction automatique {numero_str} vérifiée: {status}")
 
         # Generate periodic report every 20 predictions
         if len(predictor.status_log) > 0 and len(predictor.status_log) % 20 == 0:
@@ -1485,6 +1594,36 @@ async def broadcast(message):
 
     return sent_messages
 
+async def record_prediction(game_number: int, suit: Optional[str], sent_messages):
+    """Enregistre une prédiction diffusée ; l'écriture est différée et groupée (WriteBehindBuffer)"""
+    if not adb or not sent_messages:
+        return
+    chat_id, message_id = sent_messages[0]
+    try:
+        await adb.save_prediction(game_number, suit, message_id, chat_id)
+    except Exception as e:
+        print(f"❌ Erreur enregistrement prédiction #{game_number}: {e}")
+
+async def record_status(game_number: int, status: str):
+    """Enregistre le nouveau statut d'une prédiction (écriture différée)"""
+    if not adb:
+        return
+    try:
+        await adb.update_prediction_status(game_number, status)
+    except Exception as e:
+        print(f"❌ Erreur enregistrement statut #{game_number}: {e}")
+
+async def claim_message(message_text: str, chat_id: int) -> bool:
+    """Réserve un message du canal stats: False s'il a déjà été traité (cache LRU puis base)"""
+    if not adb:
+        return True
+    try:
+        return await adb.claim_message(message_text, chat_id)
+    except Exception as e:
+        # Base indisponible: on traite quand même, le prédicteur garde sa propre déduplication
+        print(f"❌ Erreur déduplication message: {e}")
+        return True
+
 async def edit_prediction_message(game_number: int, new_status: str):
     """Edit prediction message with new status"""
     try:
@@ -1542,6 +1681,13 @@ async def health_check(request):
     """Health check endpoint"""
     return web.Response(text="Bot is running!", status=200)
 
+async def readiness_check(request):
+    """Readiness endpoint - 503 when the event loop lags or work piles up"""
+    ready, report = readiness.check()
+    if shutdown.draining:
+        ready, report['status'] = False, 'draining'
+    return web.json_response(report, status=200 if ready else 503)
+
 async def bot_status(request):
     """Bot status endpoint"""
     status = {
@@ -1558,6 +1704,7 @@ async def create_web_server():
     app = web.Application()
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
+    app.router.add_get('/ready', readiness_check)
     app.router.add_get('/status', bot_status)
 
     runner = web.AppRunner(app)
@@ -1567,6 +1714,17 @@ async def create_web_server():
     print(f"✅ Serveur web démarré sur 0.0.0.0:{PORT}")
     return runner
 
+# --- ARRÊT GRACIEUX ---
+async def graceful_shutdown():
+    """Stop launches, drain in-flight sends/edits, persist state, then disconnect"""
+    print(f"🛑 SIGTERM reçu - drain de {shutdown.inflight} traitement(s) en cours")
+    if scheduler:
+        scheduler.stop_scheduler()
+    await shutdown.finish_async()
+    print(f"💾 État sauvegardé, déconnexion ({shutdown.dropped} message(s) ignoré(s) pendant l'arrêt)")
+    if client.is_connected():
+        await client.disconnect()
+
 # --- LANCEMENT ---
 async def main():
     """Main function to start the bot"""
@@ -1581,6 +1739,11 @@ async def main():
         return
 
     try:
+        shutdown.install_async(asyncio.get_running_loop(), graceful_shutdown)
+        # Référence conservée pour que la tâche ne soit pas collectée
+        lag_monitor = asyncio.create_task(readiness.monitor_loop_lag())
+        retention = asyncio.create_task(retention_loop()) if adb else None
+
         # Start web server first
         web_runner = await create_web_server()
 
@@ -1598,6 +1761,8 @@ async def main():
         print(f"❌ Erreur critique: {e}")
         await handle_connection_error()
     finally:
+        # Couvre aussi les arrêts hors SIGTERM (déconnexion, erreur critique)
+        await shutdown.finish_async()
         try:
             if client and hasattr(client, 'is_connected') and client.is_connected():
                 await client.disconnect()
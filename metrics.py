@@ -0,0 +1,291 @@
+"""
+In-process metrics exported in the Prometheus text format.
+
+Writers never take a lock: every thread increments its own shard and the
+shards are only summed when /metrics is scraped.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    """Render a label set as {a="x",b="y"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Shards:
+    """
+    Per-thread storage; each shard has exactly one writer.
+    Shards of finished threads are folded into a single retired shard, so a
+    thread-per-request server does not accumulate one shard per request.
+    """
+
+    def __init__(self, combine: Callable):
+        self._local = threading.local()
+        # (thread, shard) des threads vivants
+        self._live: List[Tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        # combine(ancienne valeur, valeur d'un shard retiré) -> nouvelle valeur, sans modifier les arguments
+        self._combine = combine
+        self._lock = threading.Lock()
+
+    def mine(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            # Seulement à la création d'un shard: les écritures restent sans verrou
+            with self._lock:
+                self._retire_dead()
+                self._live.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead(self) -> None:
+        alive = []
+        for thread, shard in self._live:
+            if thread.is_alive():
+                alive.append((thread, shard))
+                continue
+            # Plus aucun écrivain: lecture sûre
+            for key, value in shard.items():
+                self._retired[key] = self._combine(self._retired[key], value) if key in self._retired else value
+        self._live = alive
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            self._retire_dead()
+            return [self._retired.copy()] + [shard.copy() for _, shard in self._live]
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels attendus {self.labelnames}, reçus {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards(lambda total, value: total + value)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        shard = self._shards.mine()
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._shards.snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def value(self, **labels) -> float:
+        return self.values().get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self.values().items())]
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set explicitly or read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        self._functions[self._key(labels)] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        function = self._functions.get(key)
+        if function is not None:
+            return function()
+        return self._values.get(key, 0)
+
+    def collect(self) -> List[str]:
+        current = dict(self._values)
+        for key, function in list(self._functions.items()):
+            try:
+                current[key] = function()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(current.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards(lambda total, cell: [a + b for a, b in zip(total, cell)])
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        shard = self._shards.mine()
+        cell = shard.get(key)
+        if cell is None:
+            # [compteurs par bucket..., +Inf, somme]
+            cell = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[key] = cell
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._shards.snapshot():
+            for key, cell in shard.items():
+                cell = list(cell)
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = cell
+                else:
+                    for index, value in enumerate(cell):
+                        total[index] += value
+        return totals
+
+    def collect(self) -> List[str]:
+        lines = []
+        for key, cell in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cell[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(cell[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# --- Métriques du service webhook ---
+UPDATES_RECEIVED = counter(
+    'bot_updates_received_total', 'Telegram updates received by the webhook, by update type', ('type',))
+STAGE_LATENCY = histogram(
+    'bot_update_stage_seconds', 'Time spent in each update processing stage', ('stage',))
+API_LATENCY = histogram(
+    'bot_api_request_seconds', 'Telegram Bot API request latency by method', ('method',))
+API_ERRORS = counter(
+    'bot_api_errors_total', 'Telegram Bot API failures by method and reason', ('method', 'reason'))
+OUTBOUND_QUEUE_DEPTH = gauge(
+    'bot_outbound_queue_depth', 'Bot API requests queued or waiting for a response')
+PENDING_PREDICTIONS = gauge(
+    'bot_pending_predictions', 'Predictions sent and not yet verified')
+DEDUP_LOOKUPS = counter(
+    'bot_dedup_lookups_total', 'Duplicate message checks by result (hit or miss)', ('result',))
+VERIFICATIONS = counter(
+    'bot_verifications_total', 'Prediction verification outcomes', ('outcome',))
+
+
+@contextmanager
+def track_api_call(method: str):
+    """Time a Bot API request and count transport failures"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        API_ERRORS.inc(method=method, reason=type(e).__name__)
+        raise
+    finally:
+        API_LATENCY.observe(time.perf_counter() - start, method=method)
+
+
+def record_api_result(method: str, result: dict) -> None:
+    """Count a Bot API response with ok=false as an error"""
+    if not result.get('ok'):
+        API_ERRORS.inc(method=method, reason=str(result.get('error_code', 'not_ok')))
@@ -0,0 +1,296 @@
+"""
+Versioned schema migrations for the PostgreSQL and embedded SQLite databases.
+
+Each migration is a numbered list of DDL statements, applied once in its own
+transaction and recorded in schema_version (PRAGMA user_version on SQLite).
+On a database that is already up to date, startup costs a single SELECT
+instead of re-running every CREATE. Replicas starting together serialise on
+a lock, so a migration is never applied twice.
+"""
+import zlib
+from typing import List, Tuple
+
+# Classement d'un statut en issue ; doit rester identique à models.prediction_outcome
+_OUTCOME_SQL = """
+    CASE WHEN status = '⌛' THEN 'pending'
+         WHEN status LIKE '✅%' THEN 'success'
+         WHEN status LIKE '❌%' THEN 'failure'
+         ELSE 'other' END
+"""
+
+# (version, description, instructions) — ne jamais modifier une migration publiée, en ajouter une
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "schéma initial", [
+        # IF NOT EXISTS: les bases créées avant les migrations sont reprises telles quelles
+        """
+        CREATE TABLE IF NOT EXISTS bot_config (
+            id SERIAL PRIMARY KEY,
+            key VARCHAR(100) UNIQUE NOT NULL,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id SERIAL PRIMARY KEY,
+            game_number INTEGER NOT NULL,
+            suit_combination VARCHAR(10),
+            status VARCHAR(20) DEFAULT '⌛',
+            message_id BIGINT,
+            chat_id BIGINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            verified_at TIMESTAMP,
+            prediction_type VARCHAR(20) DEFAULT 'manual'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS auto_predictions (
+            id SERIAL PRIMARY KEY,
+            numero VARCHAR(10) NOT NULL,
+            lanceur VARCHAR(10),
+            heure_lancement TIME,
+            heure_prediction TIME,
+            statut VARCHAR(20) DEFAULT '⌛',
+            message_id BIGINT,
+            chat_id BIGINT,
+            launched BOOLEAN DEFAULT FALSE,
+            verified BOOLEAN DEFAULT FALSE,
+            prediction_format VARCHAR(20),
+            created_at DATE DEFAULT CURRENT_DATE,
+            UNIQUE(numero, created_at)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS message_log (
+            id SERIAL PRIMARY KEY,
+            message_hash VARCHAR(64) UNIQUE,
+            channel_id BIGINT,
+            content TEXT,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS prediction_history (
+            day DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS message_log_processed_at_idx ON message_log (processed_at)",
+        "CREATE INDEX IF NOT EXISTS predictions_created_at_idx ON predictions (created_at)",
+    ]),
+    (2, "index des requêtes fréquentes", [
+        # update_prediction_status
+        "CREATE INDEX IF NOT EXISTS predictions_game_number_idx ON predictions (game_number)",
+        # get_pending_predictions (statut puis ordre de création)
+        "CREATE INDEX IF NOT EXISTS predictions_status_created_at_idx ON predictions (status, created_at)",
+        # planification du jour: created_at seul ou created_at + numero
+        "CREATE INDEX IF NOT EXISTS auto_predictions_created_at_numero_idx ON auto_predictions (created_at, numero)",
+    ]),
+    (3, "statistiques matérialisées par jour et par issue", [
+        """
+        CREATE TABLE prediction_stats (
+            day DATE NOT NULL,
+            outcome VARCHAR(10) NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, outcome)
+        )
+        """,
+        """
+        CREATE TABLE prediction_totals (
+            outcome VARCHAR(10) PRIMARY KEY,
+            total BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        # Reprise de l'existant: lignes actives + résumé des lignes déjà purgées
+        f"""
+        INSERT INTO prediction_stats (day, outcome, total)
+        SELECT day, outcome, SUM(n) FROM (
+            SELECT created_at::date AS day, {_OUTCOME_SQL} AS outcome, 1 AS n FROM predictions
+            UNION ALL
+            SELECT day, {_OUTCOME_SQL}, total FROM prediction_history
+        ) AS p
+        GROUP BY day, outcome
+        """,
+        "INSERT INTO prediction_totals (outcome, total) SELECT outcome, SUM(total) FROM prediction_stats GROUP BY outcome",
+        # Remplacé par prediction_stats, tenu à jour à chaque écriture
+        "DROP TABLE prediction_history",
+    ]),
+    (4, "planification en cours partagée entre instances", [
+        # Entrée complète (launch_at, prediction_at, règle…) des lignes encore planifiées (live)
+        "ALTER TABLE auto_predictions ADD COLUMN entry JSONB",
+        "ALTER TABLE auto_predictions ADD COLUMN live BOOLEAN NOT NULL DEFAULT FALSE",
+        "CREATE INDEX auto_predictions_live_idx ON auto_predictions (numero) WHERE live",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Même schéma pour le moteur SQLite embarqué (sqlite_db.py) ; version dans PRAGMA user_version
+SQLITE_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "schéma initial", [
+        """
+        CREATE TABLE IF NOT EXISTS bot_config (
+            id INTEGER PRIMARY KEY,
+            key TEXT UNIQUE NOT NULL,
+            value TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY,
+            game_number INTEGER NOT NULL,
+            suit_combination TEXT,
+            status TEXT DEFAULT '⌛',
+            message_id INTEGER,
+            chat_id INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            verified_at TEXT,
+            prediction_type TEXT DEFAULT 'manual'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS auto_predictions (
+            id INTEGER PRIMARY KEY,
+            numero TEXT NOT NULL,
+            lanceur TEXT,
+            heure_lancement TEXT,
+            heure_prediction TEXT,
+            statut TEXT DEFAULT '⌛',
+            message_id INTEGER,
+            chat_id INTEGER,
+            launched INTEGER DEFAULT 0,
+            verified INTEGER DEFAULT 0,
+            prediction_format TEXT,
+            created_at TEXT DEFAULT CURRENT_DATE,
+            UNIQUE(numero, created_at)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS message_log (
+            id INTEGER PRIMARY KEY,
+            message_hash TEXT UNIQUE,
+            channel_id INTEGER,
+            content TEXT,
+            processed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS prediction_history (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS message_log_processed_at_idx ON message_log (processed_at)",
+        "CREATE INDEX IF NOT EXISTS predictions_created_at_idx ON predictions (created_at)",
+        "CREATE INDEX IF NOT EXISTS predictions_game_number_idx ON predictions (game_number)",
+        "CREATE INDEX IF NOT EXISTS predictions_status_created_at_idx ON predictions (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS auto_predictions_created_at_numero_idx ON auto_predictions (created_at, numero)",
+    ]),
+    (2, "statistiques matérialisées par jour et par issue", [
+        """
+        CREATE TABLE prediction_stats (
+            day TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, outcome)
+        )
+        """,
+        """
+        CREATE TABLE prediction_totals (
+            outcome TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        f"""
+        INSERT INTO prediction_stats (day, outcome, total)
+        SELECT day, outcome, SUM(n) FROM (
+            SELECT date(created_at) AS day, {_OUTCOME_SQL} AS outcome, 1 AS n FROM predictions
+            UNION ALL
+            SELECT day, {_OUTCOME_SQL}, total FROM prediction_history
+        ) AS p
+        GROUP BY day, outcome
+        """,
+        "INSERT INTO prediction_totals (outcome, total) SELECT outcome, SUM(total) FROM prediction_stats GROUP BY outcome",
+        "DROP TABLE prediction_history",
+    ]),
+    (3, "planification en cours partagée entre instances", [
+        "ALTER TABLE auto_predictions ADD COLUMN entry TEXT",
+        "ALTER TABLE auto_predictions ADD COLUMN live INTEGER NOT NULL DEFAULT 0",
+        "CREATE INDEX auto_predictions_live_idx ON auto_predictions (numero) WHERE live",
+    ]),
+]
+
+_LOCK_KEY = zlib.crc32(b"schema_migrations")
+
+
+def current_version(cur) -> int:
+    """Applied schema version, 0 on a database without schema_version"""
+    cur.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+
+def migrate(db) -> int:
+    """Apply pending migrations through db.connection(); returns the schema version"""
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            version = current_version(cur)
+    if version >= LATEST_VERSION:
+        return version
+
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            # Verrou relâché à la fin de la transaction ; une autre instance a pu migrer entre-temps
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            version = current_version(cur)
+            for number, description, statements in MIGRATIONS:
+                if number <= version:
+                    continue
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (number, description)
+                )
+                print(f"🗄️ Migration {number} appliquée: {description}")
+                version = number
+    return version
+
+
+def migrate_sqlite(conn) -> int:
+    """Apply pending SQLITE_MIGRATIONS on an autocommit sqlite3 connection"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SQLITE_MIGRATIONS[-1][0]:
+        return version
+    # IMMEDIATE: un seul processus migre, les autres attendent puis relisent la version
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, description, statements in SQLITE_MIGRATIONS:
+            if number <= version:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA n'accepte pas de paramètre ; number vient de la liste ci-dessus
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+            print(f"🗄️ Migration SQLite {number} appliquée: {description}")
+            version = number
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return version
@@ -2,12 +2,236 @@
 Modèles de base de données pour la persistance du bot Telegram
 """
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import json
-from datetime import datetime
+import time
+import select
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, datetime
 from typing import Dict, Any, Optional, List
 
+try:
+    import psycopg2
+    from psycopg2 import sql
+    from psycopg2.extras import RealDictCursor, execute_values
+    from db_pool import ConnectionPool
+except ImportError:  # déploiement SQLite sans pilote PostgreSQL
+    psycopg2 = None
+
+from migrations import migrate
+
+# Hachés de messages récents gardés en mémoire (doublons détectés sans requête)
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_DEDUP_CACHE', '10000'))
+# 0 = message_log ne garde que le haché, pas le texte du message
+STORE_MESSAGE_CONTENT = os.getenv('MESSAGE_LOG_CONTENT', '1') != '0'
+
+# Rétention (jours, 0 = illimitée) ; les statistiques (prediction_stats) couvrent aussi les lignes purgées
+MESSAGE_LOG_RETENTION_DAYS = int(os.getenv('MESSAGE_LOG_RETENTION_DAYS', '7'))
+PREDICTION_RETENTION_DAYS = int(os.getenv('PREDICTION_RETENTION_DAYS', '90'))
+# Lignes supprimées par transaction, pour ne pas bloquer les écritures
+RETENTION_BATCH = int(os.getenv('RETENTION_BATCH', '5000'))
+
+# Connexion du verrou du planificateur: après un crash de l'hôte ou une coupure réseau, la
+# session morte est détectée (des deux côtés) en idle + interval × count secondes et le
+# serveur libère le verrou, au lieu d'attendre le délai TCP du système (plusieurs minutes)
+LOCK_KEEPALIVE_IDLE = int(os.getenv('LEADER_KEEPALIVE_IDLE', '5'))
+LOCK_KEEPALIVE_INTERVAL = int(os.getenv('LEADER_KEEPALIVE_INTERVAL', '2'))
+LOCK_KEEPALIVE_COUNT = int(os.getenv('LEADER_KEEPALIVE_COUNT', '3'))
+
+# Canal LISTEN/NOTIFY des modifications de bot_config entre instances
+CONFIG_CHANNEL = 'bot_config'
+# Délai avant de rétablir l'écoute après une coupure (secondes)
+CONFIG_LISTEN_RETRY = 5
+
+# Colonnes de auto_predictions écrites depuis la planification (hors id et created_at)
+AUTO_PREDICTION_COLUMNS = (
+    'numero', 'lanceur', 'heure_lancement', 'heure_prediction', 'statut',
+    'message_id', 'chat_id', 'launched', 'verified', 'prediction_format'
+)
+
+def live_entry_day(data: Dict[str, Any]) -> Optional[str]:
+    """Jour (AAAA-MM-JJ) d'une entrée planifiée: celui du jeu, None pour une entrée ancienne"""
+    return (data.get('prediction_at') or data.get('generated_at') or '')[:10] or None
+
+
+def message_hash(message_content: str, channel_id: int) -> str:
+    """Clé de déduplication d'un message (message_log.message_hash)"""
+    return hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
+
+
+def prediction_outcome(status: Optional[str]) -> str:
+    """Issue d'une prédiction pour prediction_stats (même règle que migrations._OUTCOME_SQL)"""
+    if status == '⌛':
+        return 'pending'
+    if status and status.startswith('✅'):
+        return 'success'
+    if status and status.startswith('❌'):
+        return 'failure'
+    return 'other'
+
+
+def stat_rows(deltas: Counter):
+    """Deltas {(jour, issue): n} → lignes (jour, issue, n) et (issue, n), triées contre les interblocages"""
+    daily = sorted((day, outcome, n) for (day, outcome), n in deltas.items() if n)
+    totals = Counter()
+    for _, outcome, n in daily:
+        totals[outcome] += n
+    return daily, sorted((outcome, n) for outcome, n in totals.items() if n)
+
+
+def status_deltas(changed_rows) -> Counter:
+    """(jour, ancien statut, nouveau statut) des lignes modifiées → deltas de prediction_stats"""
+    deltas = Counter()
+    for day, old_status, new_status in changed_rows:
+        old, new = prediction_outcome(old_status), prediction_outcome(new_status)
+        if old != new:
+            deltas[(day, old)] -= 1
+            deltas[(day, new)] += 1
+    return deltas
+
+
+def group_operations(operations: List[tuple]):
+    """
+    Regroupe les écritures consécutives de même type: [(type, [args, ...]), ...].
+    Dans un groupe de statuts, seul le dernier statut de chaque jeu est gardé.
+    """
+    groups: List[tuple] = []
+    for kind, args in operations:
+        if not groups or groups[-1][0] != kind:
+            groups.append((kind, {} if kind == 'status' else []))
+        if kind == 'status':
+            groups[-1][1][args[0]] = args
+        else:
+            groups[-1][1].append(tuple(args))
+    return [(kind, list(rows.values()) if kind == 'status' else rows) for kind, rows in groups]
+
+
+def summarize_totals(rows) -> Dict[str, int]:
+    """Lignes (issue, total) de prediction_totals → statistiques manuelles de get_stats"""
+    totals = {row['outcome']: int(row['total']) for row in rows}
+    return {
+        'total': sum(totals.values()),
+        'success': totals.get('success', 0),
+        'failure': totals.get('failure', 0),
+        'pending': totals.get('pending', 0)
+    }
+
+
+def group_daily(rows) -> Dict[str, Dict[str, int]]:
+    """Lignes (jour, issue, total) → {'AAAA-MM-JJ': {issue: total}}"""
+    daily: Dict[str, Dict[str, int]] = {}
+    for day, outcome, total in rows:
+        daily.setdefault(str(day), {})[outcome] = int(total)
+    return daily
+
+
+class RecentHashes:
+    """Bounded LRU set of message hashes, shared by the executor threads"""
+    
+    def __init__(self, maxsize: int = MESSAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._hashes: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def seen(self, message_hash: str) -> bool:
+        with self._lock:
+            if message_hash not in self._hashes:
+                return False
+            self._hashes.move_to_end(message_hash)
+            return True
+    
+    def add(self, message_hash: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._hashes[message_hash] = None
+            self._hashes.move_to_end(message_hash)
+            while len(self._hashes) > self.maxsize:
+                self._hashes.popitem(last=False)
+
+
+class ConfigCache:
+    """Raw bot_config values kept in memory until a write or a change notification"""
+    
+    MISSING = None  # clé absente de bot_config (mise en cache aussi)
+    
+    def __init__(self):
+        self._values: Dict[str, Optional[str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, load) -> Optional[str]:
+        """Cached raw value, `load()` on a miss"""
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            generation = self._generation
+        value = load()
+        with self._lock:
+            # Une invalidation pendant la lecture rend la valeur lue douteuse: pas de mise en cache
+            if generation == self._generation:
+                self._values[key] = value
+        return value
+    
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+
+
+def decode_config(raw: Optional[str], default=None):
+    """Valeur de bot_config telle que renvoyée par get_config"""
+    if raw is None:
+        return default
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, ValueError):
+        return raw
+
+
+class ConfigListener(threading.Thread):
+    """LISTEN on CONFIG_CHANNEL and invalidate the cache for every changed key"""
+    
+    def __init__(self, manager: 'DatabaseManager', cache: ConfigCache):
+        super().__init__(name='config-listener', daemon=True)
+        self.manager = manager
+        self.cache = cache
+        self._stopped = threading.Event()
+    
+    def run(self):
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self.manager.get_connection()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CONFIG_CHANNEL}")
+                # Notifications manquées pendant une coupure: tout relire
+                self.cache.invalidate()
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self.cache.invalidate(conn.notifies.pop(0).payload or None)
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                print(f"⚠️ Écoute des changements de configuration interrompue: {e}")
+                self.cache.invalidate()
+                self._stopped.wait(CONFIG_LISTEN_RETRY)
+            finally:
+                if conn is not None:
+                    conn.close()
+    
+    def stop(self):
+        self._stopped.set()
+
+
 class DatabaseManager:
     """Gestionnaire de base de données PostgreSQL pour le bot"""
     
@@ -15,78 +239,41 @@ class DatabaseManager:
         self.database_url = os.environ.get('DATABASE_URL')
         if not self.database_url:
             raise ValueError("Mode JSON : DATABASE_URL optionnelle non configurée")
+        if psycopg2 is None:
+            raise ImportError("psycopg2 requis pour PostgreSQL (ou DATABASE_URL=sqlite:///bot_data.db)")
         
+        self.pool = ConnectionPool(self.database_url)
+        # Dernière planification écrite (numero -> ligne), base du diff de save_auto_prediction_schedule
+        self._saved_schedule: Optional[Dict[str, tuple]] = None
+        self._saved_schedule_day: Optional[date] = None
+        self._schedule_lock = threading.Lock()
+        self._recent_messages = RecentHashes()
         self.init_tables()
+        self._config = ConfigCache()
+        self._config_listener = ConfigListener(self, self._config)
+        self._config_listener.start()
         print("✅ Base de données initialisée")
     
-    def get_connection(self):
-        """Retourne une connexion à la base de données"""
-        return psycopg2.connect(self.database_url)
+    def get_connection(self, **options):
+        """Retourne une connexion dédiée, hors pool (ex. verrou consultatif tenu longtemps)"""
+        return psycopg2.connect(self.database_url, **options)
+    
+    def connection(self):
+        """Connexion du pool pour une transaction: `with db.connection() as conn:`"""
+        return self.pool.connection()
+    
+    def close(self):
+        """Ferme toutes les connexions du pool"""
+        self._config_listener.stop()
+        self.pool.close()
     
     def init_tables(self):
-        """Initialise les tables de la base de données"""
-        with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                # Table pour la configuration du bot
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS bot_config (
-                        id SERIAL PRIMARY KEY,
-                        key VARCHAR(100) UNIQUE NOT NULL,
-                        value TEXT,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Table pour les prédictions manuelles
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS predictions (
-                        id SERIAL PRIMARY KEY,
-                        game_number INTEGER NOT NULL,
-                        suit_combination VARCHAR(10),
-                        status VARCHAR(20) DEFAULT '⌛',
-                        message_id BIGINT,
-                        chat_id BIGINT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        verified_at TIMESTAMP,
-                        prediction_type VARCHAR(20) DEFAULT 'manual'
-                    )
-                """)
-                
-                # Table pour les prédictions automatiques (scheduler)
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS auto_predictions (
-                        id SERIAL PRIMARY KEY,
-                        numero VARCHAR(10) NOT NULL,
-                        lanceur VARCHAR(10),
-                        heure_lancement TIME,
-                        heure_prediction TIME,
-                        statut VARCHAR(20) DEFAULT '⌛',
-                        message_id BIGINT,
-                        chat_id BIGINT,
-                        launched BOOLEAN DEFAULT FALSE,
-                        verified BOOLEAN DEFAULT FALSE,
-                        prediction_format VARCHAR(20),
-                        created_at DATE DEFAULT CURRENT_DATE,
-                        UNIQUE(numero, created_at)
-                    )
-                """)
-                
-                # Table pour l'historique des messages
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS message_log (
-                        id SERIAL PRIMARY KEY,
-                        message_hash VARCHAR(64) UNIQUE,
-                        channel_id BIGINT,
-                        content TEXT,
-                        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                conn.commit()
+        """Applique les migrations de schéma en attente (voir migrations.py)"""
+        migrate(self)
     
     def set_config(self, key: str, value: Any):
         """Sauvegarde une valeur de configuration"""
-        with self.get_connection() as conn:
+        with self.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO bot_config (key, value, updated_at)
@@ -94,49 +281,83 @@ class DatabaseManager:
                     ON CONFLICT (key) 
                     DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
                 """, (key, json.dumps(value) if isinstance(value, (dict, list)) else str(value)))
-                conn.commit()
+                # Délivré aux autres instances au commit
+                cur.execute("SELECT pg_notify(%s, %s)", (CONFIG_CHANNEL, key))
+        self._config.invalidate(key)
     
-    def get_config(self, key: str, default=None):
-        """Récupère une valeur de configuration"""
-        with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    def _load_config(self, key: str) -> Optional[str]:
+        with self.connection() as conn:
+            with conn.cursor() as cur:
                 cur.execute("SELECT value FROM bot_config WHERE key = %s", (key,))
                 result = cur.fetchone()
-                if result:
-                    try:
-                        return json.loads(result['value'])
-                    except (json.JSONDecodeError, ValueError):
-                        return result['value']
-                return default
+                return result[0] if result else ConfigCache.MISSING
+    
+    def get_config(self, key: str, default=None):
+        """Récupère une valeur de configuration (servie depuis la mémoire après la première lecture)"""
+        return decode_config(self._config.get(key, lambda: self._load_config(key)), default)
     
     def save_prediction(self, game_number: int, suit_combination: str, 
                        message_id: Optional[int] = None, chat_id: Optional[int] = None, 
                        prediction_type: str = 'manual'):
         """Sauvegarde une prédiction manuelle"""
-        with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO predictions 
-                    (game_number, suit_combination, message_id, chat_id, prediction_type)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT DO NOTHING
-                """, (game_number, suit_combination, message_id, chat_id, prediction_type))
-                conn.commit()
+        self.write_predictions([('save', (game_number, suit_combination, message_id, chat_id, prediction_type))])
     
     def update_prediction_status(self, game_number: int, status: str):
         """Met à jour le statut d'une prédiction"""
-        with self.get_connection() as conn:
+        self.write_predictions([('status', (game_number, status))])
+    
+    def write_predictions(self, operations: List[tuple]):
+        """
+        Applique en une transaction une suite d'écritures ('save', args de save_prediction)
+        et ('status', (game_number, status)), dans l'ordre, statistiques comprises.
+        """
+        with self.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE predictions 
-                    SET status = %s, verified_at = CURRENT_TIMESTAMP
-                    WHERE game_number = %s
-                """, (status, game_number))
-                conn.commit()
+                deltas = Counter()
+                for kind, rows in group_operations(operations):
+                    if kind == 'save':
+                        inserted = execute_values(cur, """
+                            INSERT INTO predictions 
+                            (game_number, suit_combination, message_id, chat_id, prediction_type)
+                            VALUES %s
+                            ON CONFLICT DO NOTHING
+                            RETURNING created_at::date, status
+                        """, rows, fetch=True)
+                        deltas.update((day, prediction_outcome(status)) for day, status in inserted)
+                    else:
+                        # Ancien statut relu sous verrou pour corriger les statistiques
+                        changed = execute_values(cur, """
+                            UPDATE predictions AS p
+                            SET status = v.status, verified_at = CURRENT_TIMESTAMP
+                            FROM (
+                                SELECT old.id, old.status AS old_status, v.status
+                                FROM (VALUES %s) AS v (game_number, status)
+                                JOIN predictions AS old ON old.game_number = v.game_number
+                                FOR UPDATE OF old
+                            ) AS v
+                            WHERE p.id = v.id
+                            RETURNING p.created_at::date, v.old_status, v.status
+                        """, rows, fetch=True)
+                        deltas.update(status_deltas(changed))
+                self._apply_stat_deltas(cur, deltas)
+    
+    def _apply_stat_deltas(self, cur, deltas: Counter):
+        """Reporte des deltas dans prediction_stats et prediction_totals (même transaction)"""
+        daily, totals = stat_rows(deltas)
+        if daily:
+            execute_values(cur, """
+                INSERT INTO prediction_stats (day, outcome, total) VALUES %s
+                ON CONFLICT (day, outcome) DO UPDATE SET total = prediction_stats.total + EXCLUDED.total
+            """, daily)
+        if totals:
+            execute_values(cur, """
+                INSERT INTO prediction_totals (outcome, total) VALUES %s
+                ON CONFLICT (outcome) DO UPDATE SET total = prediction_totals.total + EXCLUDED.total
+            """, totals)
     
     def get_pending_predictions(self) -> List[Dict]:
         """Récupère les prédictions en attente"""
-        with self.get_connection() as conn:
+        with self.connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute("""
                     SELECT * FROM predictions 
@@ -145,32 +366,73 @@ class DatabaseManager:
                 """)
                 return [dict(row) for row in cur.fetchall()]
     
+    def _auto_prediction_row(self, numero: str, data: Dict[str, Any]) -> tuple:
+        """Valeurs comparables d'une entrée (mêmes types que ceux relus en base)"""
+        return (
+            numero, data.get('lanceur'), data.get('heure_lancement'),
+            data.get('heure_prediction'), data.get('statut', '⌛'),
+            data.get('message_id'), data.get('chat_id'),
+            bool(data.get('launched', False)), bool(data.get('verified', False)),
+            data.get('prediction_format')
+        )
+    
+    def _load_saved_schedule(self, cur, day: date) -> Dict[str, tuple]:
+        cur.execute(f"""
+            SELECT {', '.join(AUTO_PREDICTION_COLUMNS)} FROM auto_predictions
+            WHERE created_at = %s
+        """, (day,))
+        saved = {}
+        for row in cur.fetchall():
+            row = list(row)
+            # TIME → 'HH:MM' comme dans la planification
+            for index in (2, 3):
+                if row[index] is not None:
+                    row[index] = str(row[index])[:5]
+            saved[row[0]] = tuple(row)
+        return saved
+    
     def save_auto_prediction_schedule(self, schedule_data: Dict[str, Any]):
-        """Sauvegarde la planification automatique complète"""
-        with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                # Supprime l'ancienne planification du jour
-                cur.execute("DELETE FROM auto_predictions WHERE created_at = CURRENT_DATE")
-                
-                # Insère la nouvelle planification
-                for numero, data in schedule_data.items():
-                    cur.execute("""
-                        INSERT INTO auto_predictions 
-                        (numero, lanceur, heure_lancement, heure_prediction, statut, 
-                         message_id, chat_id, launched, verified, prediction_format)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        numero, data.get('lanceur'), data.get('heure_lancement'),
-                        data.get('heure_prediction'), data.get('statut', '⌛'),
-                        data.get('message_id'), data.get('chat_id'),
-                        data.get('launched', False), data.get('verified', False),
-                        data.get('prediction_format')
-                    ))
-                conn.commit()
+        """
+        Synchronise la planification du jour: seules les lignes nouvelles ou modifiées
+        sont écrites (un seul INSERT … ON CONFLICT groupé), les lignes retirées supprimées.
+        Le jour est le CURRENT_DATE de la base, lu une fois par enregistrement, comme
+        pour le chargement et les mises à jour (indépendant du fuseau de l'application).
+        """
+        rows = {numero: self._auto_prediction_row(numero, data) for numero, data in schedule_data.items()}
+        with self._schedule_lock:
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT CURRENT_DATE")
+                        day = cur.fetchone()[0]
+                        saved = self._saved_schedule if self._saved_schedule_day == day else None
+                        if saved is None:
+                            # Premier enregistrement du jour: état de référence relu une fois
+                            saved = self._load_saved_schedule(cur, day)
+                        changed = [row for numero, row in rows.items() if saved.get(numero) != row]
+                        removed = [numero for numero in saved if numero not in rows]
+                        if changed:
+                            execute_values(cur, f"""
+                                INSERT INTO auto_predictions ({', '.join(AUTO_PREDICTION_COLUMNS)}, created_at)
+                                VALUES %s
+                                ON CONFLICT (numero, created_at) DO UPDATE SET
+                                    {', '.join(f"{column} = EXCLUDED.{column}" for column in AUTO_PREDICTION_COLUMNS[1:])}
+                            """, [row + (day,) for row in changed])
+                        if removed:
+                            cur.execute(
+                                "DELETE FROM auto_predictions WHERE created_at = %s AND numero = ANY(%s)",
+                                (day, removed)
+                            )
+            except Exception:
+                # État de référence incertain: relu au prochain enregistrement
+                self._saved_schedule = None
+                raise
+            self._saved_schedule = rows
+            self._saved_schedule_day = day
     
     def load_auto_prediction_schedule(self) -> Dict[str, Any]:
         """Charge la planification automatique du jour"""
-        with self.get_connection() as conn:
+        with self.connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute("""
                     SELECT * FROM auto_predictions 
@@ -193,57 +455,216 @@ class DatabaseManager:
                     }
                 return schedule
     
-    def update_auto_prediction(self, numero: str, updates: Dict[str, Any]):
-        """Met à jour une prédiction automatique"""
-        with self.get_connection() as conn:
+    def archive_auto_predictions(self, entries: List[tuple]):
+        """Archive des prédictions automatiques terminées (numero, data), datées du jour du jeu"""
+        with self.connection() as conn:
             with conn.cursor() as cur:
-                set_clause = ", ".join([f"{key} = %s" for key in updates.keys()])
-                values = list(updates.values()) + [numero]
-                
-                cur.execute(f"""
-                    UPDATE auto_predictions 
-                    SET {set_clause}
-                    WHERE numero = %s AND created_at = CURRENT_DATE
-                """, values)
+                execute_values(cur, """
+                    INSERT INTO auto_predictions
+                    (numero, lanceur, heure_lancement, heure_prediction, statut,
+                     message_id, chat_id, launched, verified, prediction_format, created_at)
+                    VALUES %s
+                    ON CONFLICT (numero, created_at) DO UPDATE SET
+                        statut = EXCLUDED.statut,
+                        message_id = EXCLUDED.message_id,
+                        chat_id = EXCLUDED.chat_id,
+                        launched = EXCLUDED.launched,
+                        verified = EXCLUDED.verified,
+                        prediction_format = EXCLUDED.prediction_format,
+                        live = FALSE
+                """, [(
+                    numero, data.get('lanceur'), data.get('heure_lancement'),
+                    data.get('heure_prediction'), data.get('statut', '⌛'),
+                    data.get('message_id'), data.get('chat_id'),
+                    data.get('launched', False), data.get('verified', False),
+                    data.get('prediction_format'),
+                    (data.get('prediction_at') or '')[:10] or None
+                ) for numero, data in entries],
+                # Entrée ancienne sans prediction_at: jour de la base
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, COALESCE(%s::date, CURRENT_DATE))")
                 conn.commit()
+
+    def update_auto_prediction(self, numero: str, updates: Dict[str, Any]):
+        """Met à jour une prédiction automatique (colonnes connues uniquement)"""
+        unknown = set(updates) - set(AUTO_PREDICTION_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(sorted(unknown))}")
+        if not updates:
+            return
+        set_clause = sql.SQL(", ").join(
+            sql.SQL("{} = %s").format(sql.Identifier(column)) for column in updates
+        )
+        with self._schedule_lock:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("""
+                        UPDATE auto_predictions 
+                        SET {}
+                        WHERE numero = %s AND created_at = CURRENT_DATE
+                    """).format(set_clause), list(updates.values()) + [numero])
+            # La ligne diffère désormais de l'état de référence: réécrite au prochain enregistrement
+            if self._saved_schedule is not None:
+                self._saved_schedule.pop(numero, None)
     
-    def is_message_processed(self, message_content: str, channel_id: int) -> bool:
-        """Vérifie si un message a déjà été traité"""
-        import hashlib
-        message_hash = hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
-        
-        with self.get_connection() as conn:
+    def _upsert_live_entries(self, cur, entries: List[tuple]):
+        execute_values(cur, f"""
+            INSERT INTO auto_predictions ({', '.join(AUTO_PREDICTION_COLUMNS)}, created_at, entry, live)
+            VALUES %s
+            ON CONFLICT (numero, created_at) DO UPDATE SET
+                {', '.join(f"{column} = EXCLUDED.{column}" for column in AUTO_PREDICTION_COLUMNS[1:])},
+                entry = EXCLUDED.entry,
+                live = TRUE
+        """, [
+            self._auto_prediction_row(numero, data) + (live_entry_day(data), json.dumps(data))
+            for numero, data in entries
+        ], template=f"({', '.join(['%s'] * len(AUTO_PREDICTION_COLUMNS))}, "
+                    "COALESCE(%s::date, CURRENT_DATE), %s::jsonb, TRUE)")
+
+    def put_live_entries(self, entries: List[tuple]):
+        """Enregistre l'état courant d'entrées de la planification en cours (numero, data)"""
+        with self.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT 1 FROM message_log WHERE message_hash = %s", (message_hash,))
-                return cur.fetchone() is not None
+                self._upsert_live_entries(cur, entries)
+
+    def delete_live_entries(self, numeros: List[str]):
+        """Retire des entrées de la planification en cours (les lignes archivées restent)"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM auto_predictions WHERE live AND numero = ANY(%s)", (list(numeros),))
+
+    def replace_live_schedule(self, entries: List[tuple]):
+        """Remplace toute la planification en cours, en une transaction"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM auto_predictions WHERE live")
+                if entries:
+                    self._upsert_live_entries(cur, entries)
+
+    def load_live_schedule(self) -> Dict[str, Any]:
+        """Planification en cours, telle que l'a laissée le dernier leader"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT numero, entry FROM auto_predictions WHERE live AND entry IS NOT NULL")
+                return {numero: entry for numero, entry in cur.fetchall()}
     
-    def mark_message_processed(self, message_content: str, channel_id: int):
-        """Marque un message comme traité"""
-        import hashlib
-        message_hash = hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
-        
-        with self.get_connection() as conn:
+    def acquire_advisory_lock(self, key: int):
+        """Tente un verrou consultatif de session; retourne la connexion qui le détient, ou None"""
+        # Keepalives côté client: still_held() échoue vite si le serveur a disparu
+        conn = self.get_connection(
+            keepalives=1, keepalives_idle=LOCK_KEEPALIVE_IDLE,
+            keepalives_interval=LOCK_KEEPALIVE_INTERVAL, keepalives_count=LOCK_KEEPALIVE_COUNT
+        )
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                # Keepalives côté serveur, pour cette session: le verrou d'un leader mort est libéré vite
+                cur.execute("""
+                    SELECT set_config('tcp_keepalives_idle', %s, false),
+                           set_config('tcp_keepalives_interval', %s, false),
+                           set_config('tcp_keepalives_count', %s, false)
+                """, (str(LOCK_KEEPALIVE_IDLE), str(LOCK_KEEPALIVE_INTERVAL), str(LOCK_KEEPALIVE_COUNT)))
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+                acquired = cur.fetchone()[0]
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return None
+        return conn
+
+    def claim_message(self, message_content: str, channel_id: int) -> bool:
+        """
+        Réserve un message en une seule requête: True s'il est nouveau (à traiter),
+        False s'il a déjà été traité. Les doublons récents sont détectés en mémoire.
+        """
+        digest = message_hash(message_content, channel_id)
+        if self._recent_messages.seen(digest):
+            return False
+        content = message_content if STORE_MESSAGE_CONTENT else None
+        with self.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO message_log (message_hash, channel_id, content)
                     VALUES (%s, %s, %s)
                     ON CONFLICT (message_hash) DO NOTHING
-                """, (message_hash, channel_id, message_content))
-                conn.commit()
+                    RETURNING 1
+                """, (digest, channel_id, content))
+                claimed = cur.fetchone() is not None
+        self._recent_messages.add(digest)
+        return claimed
+    
+    def is_message_processed(self, message_content: str, channel_id: int) -> bool:
+        """Vérifie si un message a déjà été traité (préférer claim_message)"""
+        digest = message_hash(message_content, channel_id)
+        if self._recent_messages.seen(digest):
+            return True
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM message_log WHERE message_hash = %s", (digest,))
+                processed = cur.fetchone() is not None
+        if processed:
+            self._recent_messages.add(digest)
+        return processed
+    
+    def mark_message_processed(self, message_content: str, channel_id: int):
+        """Marque un message comme traité"""
+        self.claim_message(message_content, channel_id)
+    
+    def _prune_batches(self, query: str, days: int, batch: int) -> int:
+        """Exécute `query` (qui renvoie le nombre de lignes supprimées) par lots jusqu'à épuisement"""
+        removed = 0
+        while True:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (days, batch))
+                    count = cur.fetchone()[0]
+            removed += count
+            if count < batch:
+                return removed
+    
+    def prune_history(self, message_days: int = MESSAGE_LOG_RETENTION_DAYS,
+                      prediction_days: int = PREDICTION_RETENTION_DAYS,
+                      batch: int = RETENTION_BATCH) -> Dict[str, int]:
+        """
+        Applique les fenêtres de rétention: supprime l'historique des messages et les
+        prédictions anciennes (déjà comptées dans prediction_stats).
+        Sûr si plusieurs instances purgent en même temps (SKIP LOCKED).
+        """
+        result = {'messages': 0, 'predictions': 0}
+        if message_days > 0:
+            result['messages'] = self._prune_batches("""
+                WITH gone AS (
+                    DELETE FROM message_log WHERE id IN (
+                        SELECT id FROM message_log
+                        WHERE processed_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                        LIMIT %s FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM gone
+            """, message_days, batch)
+        if prediction_days > 0:
+            result['predictions'] = self._prune_batches("""
+                WITH gone AS (
+                    DELETE FROM predictions WHERE id IN (
+                        SELECT id FROM predictions
+                        WHERE created_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                        LIMIT %s FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM gone
+            """, prediction_days, batch)
+        return result
     
     def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques du bot"""
-        with self.get_connection() as conn:
+        with self.connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Statistiques des prédictions manuelles
-                cur.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        COUNT(CASE WHEN status LIKE '✅%' THEN 1 END) as success,
-                        COUNT(CASE WHEN status = '⌛' THEN 1 END) as pending
-                    FROM predictions
-                """)
-                manual_stats = cur.fetchone()
+                # Statistiques des prédictions manuelles: quelques lignes, quel que soit l'historique
+                cur.execute("SELECT outcome, total FROM prediction_totals")
+                manual_stats = summarize_totals(cur.fetchall())
                 
                 # Statistiques des prédictions automatiques
                 cur.execute("""
@@ -257,18 +678,34 @@ class DatabaseManager:
                 auto_stats = cur.fetchone()
                 
                 return {
-                    'manual': dict(manual_stats) if manual_stats else {},
+                    'manual': manual_stats,
                     'auto': dict(auto_stats) if auto_stats else {}
                 }
+    
+    def get_daily_stats(self, days: int = 30) -> Dict[str, Dict[str, int]]:
+        """Prédictions par jour et par issue sur les `days` derniers jours"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT day, outcome, total FROM prediction_stats
+                    WHERE day > CURRENT_DATE - %s
+                    ORDER BY day
+                """, (days,))
+                return group_daily(cur.fetchall())
 
 # Instance globale
 db = None
 
 def init_database():
-    """Initialise la base de données"""
+    """Initialise la base de données: SQLite embarqué si DATABASE_URL=sqlite://..., PostgreSQL sinon"""
     global db
     try:
-        db = DatabaseManager()
+        database_url = os.environ.get('DATABASE_URL') or ''
+        if database_url.startswith('sqlite:'):
+            from sqlite_db import SQLiteDatabaseManager, sqlite_path
+            db = SQLiteDatabaseManager(sqlite_path(database_url))
+        else:
+            db = DatabaseManager()
         return db
     except Exception as e:
         print(f"❌ Erreur initialisation base de données: {e}")
@@ -0,0 +1,79 @@
+"""
+Shared outbound path to the Telegram Bot API.
+
+All bots hosted in the process send through one pooled HTTP session. A
+bounded number of requests are on the wire at once; the rest wait in line,
+which is what bot_outbound_queue_depth reports.
+"""
+import os
+import time
+import itertools
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import fastjson
+from metrics import track_api_call, record_api_result, OUTBOUND_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = "https://api.telegram.org"
+
+POOL_SIZE = int(os.getenv('OUTBOUND_POOL_SIZE', '20'))
+MAX_CONCURRENCY = int(os.getenv('OUTBOUND_MAX_CONCURRENCY', '8'))
+
+
+class OutboundScheduler:
+    """Bounded, connection-pooled Bot API client shared by every bot"""
+
+    def __init__(self, pool_size: int = POOL_SIZE, max_concurrency: int = MAX_CONCURRENCY):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Envois en attente ou en cours: ticket -> instant d'entrée (monotonic)
+        self._pending: Dict[int, float] = {}
+        self._tickets = itertools.count()
+
+    def depth(self) -> int:
+        """Requests queued or on the wire"""
+        return len(self._pending)
+
+    def oldest_pending_age(self) -> float:
+        """Seconds the oldest queued or in-flight request has been waiting (0 if none)"""
+        started = list(self._pending.values())
+        return time.monotonic() - min(started) if started else 0.0
+
+    def call(self, token: str, method: str, timeout: float = 10, http_method: str = 'POST',
+             json: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """Call a Bot API method and return the decoded response
+
+        `json` bodies are encoded with fastjson. Transport errors propagate as
+        requests exceptions, like requests.post.
+        """
+        url = f"{API_BASE_URL}/bot{token}/{method}"
+        if json is not None:
+            kwargs['data'] = fastjson.dumps(json)
+            kwargs['headers'] = {'Content-Type': 'application/json'}
+        ticket = next(self._tickets)
+        self._pending[ticket] = time.monotonic()
+        try:
+            with track_api_call(method):
+                with self._slots:
+                    response = self.session.request(http_method, url, timeout=timeout, **kwargs)
+        finally:
+            self._pending.pop(ticket, None)
+        result = fastjson.loads(response.content)
+        record_api_result(method, result)
+        return result
+
+    def close(self) -> None:
+        self.session.close()
+
+
+# Instance partagée par tous les bots du processus
+outbound = OutboundScheduler()
+OUTBOUND_QUEUE_DEPTH.set_function(outbound.depth)
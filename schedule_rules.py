@@ -0,0 +1,165 @@
+"""
+Declarative schedule rules for the automatic prediction scheduler.
+
+A rule is a five-field cron expression for the predicted game time plus a
+lead-time range for the launch, e.g. in bot_config.json:
+
+    "schedule_rules": [
+        {"name": "horaire", "cron": "0 * * * *", "lead": "1-4"},
+        {"name": "soir", "cron": "*/10 18-23 * * 1-5", "lead": 2}
+    ]
+
+Fields are minute, hour, day of month, month, day of week (0 or 7 = Sunday)
+and accept '*', lists, ranges and steps. Each rule is compiled to sorted value
+lists and next_after() jumps straight to the next matching minute with
+bisect, so a dense rule ('* * * * *') costs the same as a sparse one and the
+scheduler only ever keeps one pending entry per rule.
+"""
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# (minimum, maximum) par champ
+_FIELDS = [
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+]
+
+# Au-delà, la règle ne peut jamais correspondre (ex. 30 février)
+_MAX_DAYS_SCANNED = 366 * 5
+
+
+def _parse_field(text: str, low: int, high: int) -> List[int]:
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"pas invalide: {text}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"valeur hors limites [{low}-{high}]: {text}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def _parse_lead(lead: Any) -> Tuple[int, int]:
+    """'1-4' → (1, 4); 2 → (2, 2)"""
+    if isinstance(lead, int):
+        return lead, lead
+    text = str(lead)
+    if '-' in text:
+        low, high = (int(value) for value in text.split('-', 1))
+    else:
+        low = high = int(text)
+    if low < 0 or low > high:
+        raise ValueError(f"avance invalide: {lead}")
+    return low, high
+
+
+class ScheduleRule:
+    """One compiled cron rule with its launch lead-time range (minutes)"""
+
+    def __init__(self, name: str, cron: str, lead: Any = "1-4"):
+        fields = cron.split()
+        if len(fields) != 5:
+            raise ValueError(f"expression cron à 5 champs attendue: {cron!r}")
+        self.name = name
+        self.cron = cron
+        parsed = [_parse_field(text, low, high) for text, (_, low, high) in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # cron: 0 et 7 désignent dimanche ; datetime.weekday(): lundi = 0
+        self.weekdays = {(value - 1) % 7 for value in weekdays}
+        # Sémantique cron: si jour du mois ET jour de semaine sont restreints, l'un ou l'autre suffit
+        self._day_restricted = fields[2] != '*'
+        self._weekday_restricted = fields[4] != '*'
+        self.lead_min, self.lead_max = _parse_lead(lead)
+        # Un lancement doit précéder son jeu sans chevaucher l'occurrence précédente
+        period = self.shortest_period()
+        if self.lead_max >= period:
+            raise ValueError(f"avance {self.lead_max} min ≥ période de la règle ({period} min): {cron!r}")
+
+    def shortest_period(self) -> int:
+        """
+        Shortest possible interval (minutes) between two fire times: between listed
+        minutes of one hour, or across the nearest allowed hours (cyclically).
+        """
+        minutes, hours = self.minutes, self.hours
+        gaps = [later - earlier for earlier, later in zip(minutes, minutes[1:])]
+        hour_gaps = [later - earlier for earlier, later in zip(hours, hours[1:])] + [24 - hours[-1] + hours[0]]
+        gaps.append(60 * min(hour_gaps) - minutes[-1] + minutes[0])
+        return min(gaps)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = moment.weekday() in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, moment: datetime) -> Optional[datetime]:
+        """First matching minute strictly after `moment`, None if the rule can never fire"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = candidate.replace(hour=0, minute=0)
+        for _ in range(_MAX_DAYS_SCANNED):
+            if day.month not in self.months:
+                # Saut direct au premier jour du prochain mois autorisé
+                index = bisect_left(self.months, day.month)
+                if index < len(self.months):
+                    day = day.replace(month=self.months[index], day=1)
+                else:
+                    day = day.replace(year=day.year + 1, month=self.months[0], day=1)
+                continue
+            if self._day_matches(day):
+                start_hour = candidate.hour if day.date() == candidate.date() else 0
+                index = bisect_left(self.hours, start_hour)
+                while index < len(self.hours):
+                    hour = self.hours[index]
+                    start_minute = candidate.minute if (day.date() == candidate.date() and hour == candidate.hour) else 0
+                    minute_index = bisect_left(self.minutes, start_minute)
+                    if minute_index < len(self.minutes):
+                        return day.replace(hour=hour, minute=self.minutes[minute_index])
+                    index += 1
+            day += timedelta(days=1)
+        return None
+
+    def iter_after(self, moment: datetime) -> Iterator[datetime]:
+        """Successive fire times after `moment`"""
+        fire = self.next_after(moment)
+        while fire is not None:
+            yield fire
+            fire = self.next_after(fire)
+
+    def draw_lead(self) -> int:
+        """Launch lead in minutes, drawn in the configured range"""
+        return random.randint(self.lead_min, self.lead_max)
+
+    def next_launch(self, now: datetime, after: Optional[datetime] = None) -> Optional[Tuple[datetime, int]]:
+        """
+        (fire time, lead) of the first occurrence after `after` whose launch,
+        fire - lead, is not already past at `now`; None if the rule can never fire
+        """
+        lead = self.draw_lead()
+        earliest = now + timedelta(minutes=lead)
+        fire = self.next_after(max(earliest, after) if after else earliest)
+        return None if fire is None else (fire, lead)
+
+
+def compile_rules(specs: Optional[Iterable[Dict[str, Any]]]) -> List[ScheduleRule]:
+    """Compile rule dicts from the configuration ({'cron', 'lead', 'name'})"""
+    rules = []
+    for index, spec in enumerate(specs or []):
+        rules.append(ScheduleRule(spec.get('name') or f"regle{index + 1}", spec['cron'], spec.get('lead', "1-4")))
+    return rules
@@ -1,15 +1,42 @@
 import random
 import asyncio
-import yaml
+import heapq
+import itertools
 import os
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-from telethon import TelegramClient
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+from schedule_store import ScheduleStore, ScheduleArchive
+from clock import SystemClock
+from schedule_rules import ScheduleRule
+from leader import LeaderLock, FileLeaderLock, RETRY_SECONDS as LEADER_RETRY_SECONDS
+
+if TYPE_CHECKING:
+    from telethon import TelegramClient
+
+# Format des horodatages absolus stockés dans la planification
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Retard maximal toléré pour rattraper un lancement manqué (redémarrage, boucle bloquée)
+LAUNCH_GRACE_SECONDS = float(os.getenv('SCHEDULER_LAUNCH_GRACE', '180'))
+
+# Horizon glissant: seules les N prochaines heures sont gardées en mémoire
+HORIZON_HOURS = int(os.getenv('SCHEDULER_HORIZON_HOURS', '12'))
+
+# Nombre maximal d'envois simultanés quand plusieurs lancements tombent ensemble
+LAUNCH_CONCURRENCY = int(os.getenv('SCHEDULER_LAUNCH_CONCURRENCY', '5'))
+
+# Intervalle entre deux passes d'archivage / complément de l'horizon
+MAINTENANCE_INTERVAL = timedelta(minutes=15)
 
 class PredictionScheduler:
     """Système de planification automatique des prédictions"""
     
-    def __init__(self, client: TelegramClient, predictor, source_channel_id: int, target_channel_id: int):
+    def __init__(self, client: 'TelegramClient', predictor, source_channel_id: int, target_channel_id: int,
+                 archive: Optional[ScheduleArchive] = None, leader: Optional[LeaderLock] = None,
+                 clock=None, schedule_file: str = "prediction.yaml", rules: Optional[List[ScheduleRule]] = None,
+                 store=None):
         """
         Initialise le planificateur
         
@@ -18,19 +45,103 @@ class PredictionScheduler:
             predictor: Instance du CardPredictor
             source_channel_id: ID du canal source pour vérification
             target_channel_id: ID du canal cible pour diffusion
+            archive: Destination des entrées terminées (fichiers gzip par défaut)
+            leader: Verrou d'élection; seule l'instance qui le détient lance (fichier local par défaut)
+            clock: Source de temps (horloge système par défaut, VirtualClock en simulation)
+            schedule_file: Instantané YAML de la planification
+            rules: Règles cron (schedule_rules); sans règle, une prédiction par heure à partir de maintenant
+            store: Stockage de la planification en cours (YAML + journal local par défaut,
+                   base partagée entre instances avec make_schedule_store(database))
         """
         self.client = client
         self.predictor = predictor
         self.source_channel_id = source_channel_id
         self.target_channel_id = target_channel_id
-        self.schedule_file = "prediction.yaml"
+        self.clock = clock or SystemClock()
+        self.schedule_file = schedule_file
+        self.store = store or ScheduleStore(self.schedule_file)
+        self.archive = archive or ScheduleArchive()
+        self.horizon_hours = HORIZON_HOURS
+        self.rules = rules or []
+        # Par règle: numéro de son entrée en attente et dernière occurrence matérialisée
+        self._rule_pending: Dict[str, str] = {}
+        self._rule_cursor: Dict[str, datetime] = {}
         self.is_running = False
+        self.leader = leader or FileLeaderLock()
+        self.is_leader = False
         self.schedule_data = {}
+        # Fabrique de context manager marquant un lancement en cours (ShutdownCoordinator.track)
+        self.work_tracker = None
+        # File de priorité des lancements: (échéance monotone, séquence, numéro)
+        self._timers = []
+        # Échéance monotone par (numéro, launch_at), fixée au premier armement: un saut de
+        # l'horloge murale (NTP, changement manuel, heure d'été) ne décale plus les lancements
+        self._deadlines: Dict[Tuple[str, str], float] = {}
+        self._timer_seq = itertools.count()
+        # Séquence valide par numéro; les entrées périmées du tas sont ignorées au dépilement
+        self._timer_tokens: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        # Index de vérification: numéro de jeu (numéro prédit + 0/1/2) -> numéros lancés non vérifiés
+        self._targets: Dict[int, List[str]] = {}
+        # Compteurs tenus à jour à chaque lancement/vérification (le total est len(schedule_data))
+        self._launched_count = 0
+        self._verified_count = 0
+        self._expired_count = 0
+        self.launch_grace = LAUNCH_GRACE_SECONDS
+        self.launch_concurrency = LAUNCH_CONCURRENCY
+        # Contrôle périodique du verrou (0 = désactivé, ex. simulation mono-instance)
+        self.leader_check_interval = LEADER_RETRY_SECONDS
+        self.maintenance_interval = MAINTENANCE_INTERVAL
+        # Échéances en temps monotone (clock.monotonic())
+        self._next_maintenance: Optional[float] = None
+        self._next_leader_check: Optional[float] = None
+        # Retard (secondes) des derniers lancements par rapport à launch_at
+        self.launch_lateness: deque = deque(maxlen=1000)
         
+    @staticmethod
+    def make_entry(prediction_time: datetime, launch_offset_minutes: int, generated_at: datetime) -> Dict[str, Any]:
+        """Construit une entrée avec horodatages absolus (les champs HH:MM restent pour l'affichage)"""
+        launch_time = prediction_time - timedelta(minutes=launch_offset_minutes)
+        return {
+            "heure_lancement": launch_time.strftime("%H:%M"),
+            "heure_prediction": prediction_time.strftime("%H:%M"),
+            "launch_at": launch_time.strftime(TIMESTAMP_FORMAT),
+            "prediction_at": prediction_time.strftime(TIMESTAMP_FORMAT),
+            "statut": "⌛",
+            "message_id": None,
+            "chat_id": None,
+            "launched": False,
+            "verified": False,
+            "generated_at": generated_at.strftime(TIMESTAMP_FORMAT),
+            "launch_offset": launch_offset_minutes
+        }
+
+    @staticmethod
+    def _legacy_datetime(data: Dict[str, Any], hhmm: str) -> datetime:
+        """Horodatage d'une ancienne entrée HH:MM: première occurrence après generated_at"""
+        generated_at = datetime.strptime(data["generated_at"], TIMESTAMP_FORMAT)
+        hour, minute = map(int, hhmm.split(":"))
+        moment = generated_at.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if moment < generated_at.replace(second=0, microsecond=0):
+            moment += timedelta(days=1)
+        return moment
+
+    def launch_at(self, data: Dict[str, Any]) -> datetime:
+        """Instant absolu de lancement d'une entrée"""
+        if data.get("launch_at"):
+            return datetime.strptime(data["launch_at"], TIMESTAMP_FORMAT)
+        return self._legacy_datetime(data, data["heure_lancement"])
+
+    def prediction_at(self, data: Dict[str, Any]) -> datetime:
+        """Instant absolu du jeu ciblé par une entrée"""
+        if data.get("prediction_at"):
+            return datetime.strptime(data["prediction_at"], TIMESTAMP_FORMAT)
+        return self._legacy_datetime(data, data["heure_prediction"])
+
     def generate_next_prediction_time(self, current_time: Optional[datetime] = None) -> Dict[str, Any]:
         """Génère la prochaine prédiction avec lancement variable (1-4 min avant)"""
         if current_time is None:
-            current_time = datetime.now()
+            current_time = self.clock.now()
         
         # Ajouter un intervalle fixe pour la prochaine prédiction (ex: 1 heure)
         next_time = current_time + timedelta(hours=1)
@@ -41,30 +152,33 @@ class PredictionScheduler:
         
         # VARIABLE: Heure de lancement entre 1-4 minutes avant la prédiction
         launch_offset_minutes = random.randint(1, 4)  # 1-4 minutes avant comme demandé
-        launch_time = next_time - timedelta(minutes=launch_offset_minutes)
         
-        prediction_data = {
-            "numero": numero_predit,
-            "heure_lancement": launch_time.strftime("%H:%M"),
-            "heure_prediction": next_time.strftime("%H:%M"),
-            "statut": "⌛",
-            "message_id": None,
-            "chat_id": None,
-            "launched": False,
-            "verified": False,
-            "generated_at": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "launch_offset": launch_offset_minutes
-        }
+        prediction_data = {"numero": numero_predit}
+        prediction_data.update(self.make_entry(next_time, launch_offset_minutes, current_time))
         
         return prediction_data
 
     def generate_daily_schedule(self) -> Dict[str, Any]:
-        """Génère une planification avec heures de lancement variables"""
+        """Génère une fenêtre glissante de horizon_hours heures à partir de maintenant"""
         planification = {}
-        current_time = datetime.now()
+        current_time = self.clock.now()
+        
+        if self.rules:
+            # Règles cron: seule la prochaine occurrence de chaque règle est matérialisée
+            for rule in self.rules:
+                occurrence = rule.next_launch(current_time)
+                if occurrence is None:
+                    print(f"⚠️ Règle {rule.name} ({rule.cron}) sans occurrence future")
+                    continue
+                fire, lead = occurrence
+                numero = self._unique_numero(f"N{fire.hour:02d}{fire.minute:02d}", planification)
+                planification[numero] = self.make_entry(fire, lead, current_time)
+                planification[numero]["rule"] = rule.name
+            print(f"✅ Planification par règles générée: {len(planification)} prédiction(s)")
+            return planification
         
         # Générer des prédictions toutes les heures avec lancement variable
-        num_predictions = 12  # 12 prédictions sur 12 heures
+        num_predictions = self.horizon_hours  # une prédiction par heure de la fenêtre
         
         for i in range(num_predictions):
             # Calculer l'heure de prédiction (toutes les heures)
@@ -75,87 +189,229 @@ class PredictionScheduler:
             
             # VARIABLE: Lancement entre 1-4 minutes avant comme demandé
             launch_offset_minutes = random.randint(1, 4)
-            launch_time = prediction_time - timedelta(minutes=launch_offset_minutes)
             
-            # Éviter les doublons de numéros
-            counter = 0
-            original_numero = numero
-            while numero in planification:
-                counter += 1
-                numero = f"{original_numero}_{counter}"
+            # Éviter les doublons de numéros (horizon > 24 h): le numéro reste un numéro de jeu
+            numero = self._unique_numero(numero, planification)
             
-            planification[numero] = {
-                "heure_lancement": launch_time.strftime("%H:%M"),
-                "heure_prediction": prediction_time.strftime("%H:%M"),
-                "statut": "⌛",
-                "message_id": None,
-                "chat_id": None,
-                "launched": False,
-                "verified": False,
-                "generated_at": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "launch_offset": launch_offset_minutes
-            }
+            planification[numero] = self.make_entry(prediction_time, launch_offset_minutes, current_time)
         
         print(f"✅ Planification avec lancement variable générée: {num_predictions} prédictions")
         print(f"    Variations de lancement: 1-4 minutes avant chaque prédiction")
         return planification
     
     def save_schedule(self, schedule_data: Dict[str, Any]):
-        """Sauvegarde la planification dans le fichier YAML"""
+        """Exporte la planification complète dans le fichier YAML (instantané)"""
         try:
-            with open(self.schedule_file, "w", encoding='utf-8') as f:
-                yaml.dump(schedule_data, f, allow_unicode=True, default_flow_style=False)
+            self.store.replace_all(schedule_data)
             print(f"✅ Planification sauvegardée dans {self.schedule_file}")
         except Exception as e:
             print(f"❌ Erreur sauvegarde planification: {e}")
     
+    def save_entry(self, numero: str):
+        """Journalise l'état d'une seule entrée (O(1) I/O)"""
+        try:
+            self.store.put(numero, self.schedule_data[numero])
+        except Exception as e:
+            print(f"❌ Erreur journalisation {numero}: {e}")
+    
     def load_schedule(self) -> Dict[str, Any]:
-        """Charge la planification depuis le fichier YAML"""
+        """Charge la planification (instantané YAML + journal)"""
         try:
-            if os.path.exists(self.schedule_file):
-                with open(self.schedule_file, "r", encoding='utf-8') as f:
-                    data = yaml.safe_load(f) or {}
+            data = self.store.load()
+            if data:
                 print(f"✅ Planification chargée: {len(data)} entrées")
-                return data
             else:
                 print("ℹ️ Aucune planification existante, génération d'une nouvelle")
-                return {}
+            return data
         except Exception as e:
             print(f"❌ Erreur chargement planification: {e}")
             return {}
     
     def get_current_time_slot(self) -> str:
         """Retourne le créneau horaire actuel au format HH:MM"""
-        now = datetime.now()
+        now = self.clock.now()
         return now.strftime("%H:%M")
     
-    def get_pending_launches(self, current_time: str) -> list:
-        """Retourne les prédictions à lancer pour l'heure actuelle"""
-        pending = []
+    def _deadline(self, numero: str, data: Dict[str, Any]) -> float:
+        """
+        Échéance monotone du lancement. Convertie une seule fois depuis l'horodatage mural
+        (via timestamp(), qui tient compte de l'heure d'été), puis conservée.
+        """
+        deadline = self._deadlines.get(self._deadline_key(numero, data))
+        if deadline is None:
+            wall_delay = self.launch_at(data).timestamp() - self.clock.now().timestamp()
+            # Arrondi à la microseconde, la résolution des horodatages
+            deadline = round(self.clock.monotonic() + wall_delay, 6)
+            self._deadlines[self._deadline_key(numero, data)] = deadline
+        return deadline
+
+    def _deadline_key(self, numero: str, data: Dict[str, Any]) -> Tuple[str, str]:
+        return numero, self.launch_at(data).strftime(TIMESTAMP_FORMAT)
+
+    def _forget_deadline(self, numero: str, data: Dict[str, Any]):
+        """Libère l'échéance d'une entrée qui quitte la file (lancée, expirée, archivée)"""
+        self._deadlines.pop(self._deadline_key(numero, data), None)
+
+    def _schedule_timer(self, numero: str, data: Dict[str, Any]):
+        """Arme le minuteur d'une entrée en O(log n)"""
+        if data["launched"] or data["statut"] != "⌛":
+            return
+        seq = next(self._timer_seq)
+        self._timer_tokens[numero] = seq
+        heapq.heappush(self._timers, (self._deadline(numero, data), seq, numero))
+        self._notify()
+
+    def _rebuild_timers(self):
+        """Reconstruit la file de priorité depuis schedule_data (heapify, O(n))"""
+        self._timers = []
+        self._timer_tokens = {}
+        deadlines, self._deadlines = self._deadlines, {}
         for numero, data in self.schedule_data.items():
-            if (data["heure_lancement"] == current_time and 
-                not data["launched"] and 
-                data["statut"] == "⌛"):
-                pending.append((numero, data))
-        return pending
-    
+            if not data["launched"] and data["statut"] == "⌛":
+                key = self._deadline_key(numero, data)
+                if key in deadlines:
+                    self._deadlines[key] = deadlines[key]
+                seq = next(self._timer_seq)
+                self._timer_tokens[numero] = seq
+                self._timers.append((self._deadline(numero, data), seq, numero))
+        heapq.heapify(self._timers)
+        self._notify()
+
+    @staticmethod
+    def _game_number(numero: str) -> int:
+        return int(numero.replace('N', ''))
+
+    def _index_targets(self, numero: str):
+        """Enregistre les trois numéros de jeu qui peuvent vérifier une prédiction lancée"""
+        game_number = self._game_number(numero)
+        for offset in range(3):
+            numeros = self._targets.setdefault(game_number + offset, [])
+            if numero not in numeros:
+                numeros.append(numero)
+
+    def _unindex_targets(self, numero: str):
+        game_number = self._game_number(numero)
+        for offset in range(3):
+            numeros = self._targets.get(game_number + offset)
+            if numeros and numero in numeros:
+                numeros.remove(numero)
+                if not numeros:
+                    del self._targets[game_number + offset]
+
+    def _rebuild_targets(self):
+        """Reconstruit l'index de vérification depuis schedule_data (O(n))"""
+        self._targets = {}
+        for numero, data in sorted(self.schedule_data.items(), key=lambda item: self._game_number(item[0])):
+            if data["launched"] and not data["verified"]:
+                self._index_targets(numero)
+
+    def _rebuild_counts(self):
+        self._launched_count = sum(1 for data in self.schedule_data.values() if data["launched"])
+        self._verified_count = sum(1 for data in self.schedule_data.values() if data["verified"])
+        self._expired_count = sum(1 for data in self.schedule_data.values() if data.get("expired"))
+
+    def _reindex(self):
+        """Reconstruit minuteurs, index et compteurs après remplacement de schedule_data"""
+        self._rebuild_timers()
+        self._rebuild_targets()
+        self._rebuild_counts()
+        self._rebuild_rule_state()
+
+    def upcoming_launches(self, limit: int, after: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """
+        Les `limit` prochains lancements en attente, triés.
+        Parcours du tas par frontière: O(k log k) sans trier toute la planification.
+        """
+        heap = self._timers
+        upcoming = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(upcoming) < limit:
+            (_, seq, numero), index = heapq.heappop(frontier)
+            if self._timer_tokens.get(numero) == seq:
+                launch_at = self.launch_at(self.schedule_data[numero])
+                if after is None or launch_at > after:
+                    upcoming.append((numero, launch_at))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return upcoming
+
+    def _notify(self):
+        """Réveille la boucle pour recalculer la prochaine échéance"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def pop_due_launches(self) -> list:
+        """
+        Dépile les lancements arrivés à échéance (temps monotone), avec rattrapage :
+        - en retard de moins de launch_grace secondes → lancé
+        - jeu cible déjà passé ou retard au-delà de la grâce → marqué expiré
+        """
+        due = []
+        now = self.clock.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            deadline, seq, numero = heapq.heappop(self._timers)
+            if self._timer_tokens.get(numero) != seq:
+                continue
+            del self._timer_tokens[numero]
+            data = self.schedule_data.get(numero)
+            if not data or data["launched"] or data["statut"] != "⌛":
+                continue
+            lateness = now - deadline
+            lead = (self.prediction_at(data) - self.launch_at(data)).total_seconds()
+            if lateness > lead:
+                self._expire(numero, data, "jeu cible déjà passé")
+            elif lateness > self.launch_grace:
+                self._expire(numero, data, f"retard {lateness:.0f}s > {self.launch_grace:.0f}s")
+            else:
+                if lateness >= 1:
+                    print(f"⏱️ Rattrapage du lancement {numero} avec {lateness:.1f}s de retard")
+                due.append((numero, data))
+        return due
+
+    def _expire(self, numero: str, data: Dict[str, Any], reason: str):
+        """Abandonne un lancement manqué"""
+        if not data.get("expired"):
+            self._expired_count += 1
+        data["statut"] = "⏭️"
+        data["expired"] = True
+        self._forget_deadline(numero, data)
+        self.save_entry(numero)
+        print(f"⏭️ Lancement {numero} abandonné: {reason}")
+
+    def seconds_until_next_launch(self) -> Optional[float]:
+        """Délai (monotone) jusqu'au prochain lancement, None si la file est vide"""
+        while self._timers and self._timer_tokens.get(self._timers[0][2]) != self._timers[0][1]:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return None
+        return max(0.0, self._timers[0][0] - self.clock.monotonic())
+
+    @staticmethod
+    def _unique_numero(numero: str, existing: Dict[str, Any]) -> str:
+        # Éviter les doublons
+        counter = 1
+        original_numero = numero
+        while numero in existing:
+            # Modifier légèrement le numéro si doublon
+            base_num = int(original_numero[1:])
+            numero = f"N{base_num + counter:04d}"
+            counter += 1
+        return numero
+
+    def _insert_entry(self, numero: str, data: Dict[str, Any]) -> str:
+        """Ajoute une entrée (numéro dédoublonné) et arme son minuteur"""
+        numero = self._unique_numero(numero, self.schedule_data)
+        self.schedule_data[numero] = data
+        self._schedule_timer(numero, data)
+        return numero
+
     def add_next_prediction(self):
         """Ajoute une nouvelle prédiction à la planification"""
         try:
             new_prediction = self.generate_next_prediction_time()
-            numero = new_prediction.pop("numero")
-            
-            # Éviter les doublons
-            counter = 1
-            original_numero = numero
-            while numero in self.schedule_data:
-                # Modifier légèrement le numéro si doublon
-                base_num = int(original_numero[1:])
-                numero = f"N{base_num + counter:04d}"
-                counter += 1
-            
-            self.schedule_data[numero] = new_prediction
-            self.save_schedule(self.schedule_data)
+            numero = self._insert_entry(new_prediction.pop("numero"), new_prediction)
+            self.save_entry(numero)
             
             print(f"✅ Nouvelle prédiction ajoutée: {numero} à {new_prediction['heure_lancement']}")
             return numero
@@ -164,6 +420,99 @@ class PredictionScheduler:
             print(f"❌ Erreur ajout prédiction: {e}")
             return None
     
+    def extend_horizon(self, now: datetime) -> int:
+        """
+        Complète la fenêtre glissante, une prédiction par heure, entre la dernière
+        prédiction planifiée et now + horizon_hours. Seule source de nouvelles entrées
+        sans règle cron: une seule chaîne horaire, quel que soit le rythme des vérifications.
+        """
+        horizon_end = now + timedelta(hours=self.horizon_hours)
+        latest = max((self.prediction_at(data) for data in self.schedule_data.values()), default=now)
+        added = []
+        while latest + timedelta(hours=1) <= horizon_end:
+            latest += timedelta(hours=1)
+            entry = self.make_entry(latest, random.randint(1, 4), now)
+            added.append(self._insert_entry(f"N{latest.hour:02d}{latest.minute:02d}", entry))
+        if added:
+            self.store.put_many((numero, self.schedule_data[numero]) for numero in added)
+            print(f"➕ Horizon complété: {len(added)} prédiction(s) ajoutée(s)")
+        return len(added)
+
+    async def archive_finished(self, now: datetime) -> int:
+        """
+        Sort de la planification les entrées terminées (vérifiées ou expirées) et
+        celles lancées mais jamais vérifiées depuis plus de horizon_hours heures.
+        L'écriture de l'archive (base ou fichier) se fait hors de la boucle d'événements.
+        """
+        stale_before = now - timedelta(hours=self.horizon_hours)
+        finished = [
+            (numero, dict(data)) for numero, data in self.schedule_data.items()
+            if data["verified"] or data.get("expired")
+            or (data["launched"] and self.prediction_at(data) < stale_before)
+        ]
+        if not finished:
+            return 0
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.archive.archive, finished)
+        except Exception as e:
+            # Les entrées restent dans la planification et seront retentées à la prochaine passe
+            print(f"❌ Erreur archivage planification: {e}")
+            return 0
+        for numero, _ in finished:
+            self.schedule_data.pop(numero, None)
+        self._reindex()
+        # L'instantané ne contient plus que l'horizon en cours ; le journal repart de zéro
+        self.save_schedule(self.schedule_data)
+        print(f"🗄️ {len(finished)} prédiction(s) terminée(s) archivée(s)")
+        return len(finished)
+
+    async def maintain(self, now: datetime):
+        """Passe périodique: archivage puis complément de l'horizon"""
+        await self.archive_finished(now)
+        if not self.rules:
+            self.extend_horizon(now)
+
+    def _rebuild_rule_state(self):
+        self._rule_pending = {}
+        self._rule_cursor = {}
+        for numero, data in self.schedule_data.items():
+            name = data.get("rule")
+            if not name:
+                continue
+            fire = self.prediction_at(data)
+            if name not in self._rule_cursor or fire > self._rule_cursor[name]:
+                self._rule_cursor[name] = fire
+            if not data["launched"] and data["statut"] == "⌛":
+                self._rule_pending[name] = numero
+
+    def ensure_rule_entries(self, now: datetime) -> int:
+        """
+        Matérialise l'occurrence suivante de chaque règle dont l'entrée en attente
+        a été lancée ou expirée. O(nombre de règles), quelle que soit leur densité.
+        """
+        added = []
+        for rule in self.rules:
+            data = self.schedule_data.get(self._rule_pending.get(rule.name))
+            if data is not None and not data["launched"] and data["statut"] == "⌛":
+                continue
+            # Occurrence dont le lancement (fire - lead) n'est pas déjà passé
+            occurrence = rule.next_launch(now, after=self._rule_cursor.get(rule.name))
+            if occurrence is None:
+                continue
+            fire, lead = occurrence
+            entry = self.make_entry(fire, lead, now)
+            entry["rule"] = rule.name
+            numero = self._insert_entry(f"N{fire.hour:02d}{fire.minute:02d}", entry)
+            self._rule_pending[rule.name] = numero
+            self._rule_cursor[rule.name] = fire
+            added.append(numero)
+        if added:
+            try:
+                self.store.put_many((numero, self.schedule_data[numero]) for numero in added)
+            except Exception as e:
+                print(f"❌ Erreur journalisation des règles: {e}")
+        return len(added)
+
     def get_predictions_to_verify(self) -> list:
         """Retourne les prédictions à vérifier"""
         to_verify = []
@@ -174,13 +523,13 @@ class PredictionScheduler:
                 to_verify.append((numero, data))
         return to_verify
     
-    async def launch_prediction(self, numero: str, data: Dict[str, Any]):
-        """Lance une prédiction automatique selon le nouveau format"""
+    async def launch_prediction(self, numero: str, data: Dict[str, Any], persist: bool = True):
+        """Lance une prédiction automatique selon le nouveau format (persist=False: écriture laissée à l'appelant)"""
         try:
             # Vérifier les doublons avant de lancer
             game_number = int(numero.replace('N', ''))
             if game_number in self.predictor.prediction_status:
-                print(f"❌ Prédiction déjà existante pour {numero}, abandon du lancement automatique")
+                self._expire(numero, data, "prédiction déjà existante")
                 return False
             
             # Marquer comme prédiction automatique pour éviter les conflits
@@ -195,18 +544,23 @@ class PredictionScheduler:
             
             # Envoie le message au canal cible
             sent_message = await self.client.send_message(self.target_channel_id, prediction_text)
+            self.launch_lateness.append(self.clock.monotonic() - self._deadline(numero, data))
+            self._forget_deadline(numero, data)
             
             # Met à jour les données
             data["launched"] = True
             data["message_id"] = sent_message.id
             data["chat_id"] = self.target_channel_id
             data["prediction_format"] = suit_prediction
+            self._index_targets(numero)
+            self._launched_count += 1
             
             # Ajouter à la prédiction status pour éviter les doublons
             self.predictor.prediction_status[game_number] = '⌛'
             
             # Sauvegarde
-            self.save_schedule(self.schedule_data)
+            if persist:
+                self.save_entry(numero)
             
             print(f"🚀 Prédiction automatique lancée: {numero} ({suit_prediction}) à {data['heure_lancement']}")
             return True
@@ -215,6 +569,29 @@ class PredictionScheduler:
             print(f"❌ Erreur lancement prédiction {numero}: {e}")
             return False
     
+    async def launch_due(self, due: list) -> int:
+        """
+        Lance en parallèle les prédictions échues (au plus launch_concurrency envois
+        simultanés), puis journalise toutes les entrées lancées en une seule écriture.
+        """
+        semaphore = asyncio.Semaphore(self.launch_concurrency)
+
+        async def _launch(numero: str, data: Dict[str, Any]) -> bool:
+            with (self.work_tracker() if self.work_tracker else nullcontext()):
+                async with semaphore:
+                    if not self.is_running:
+                        return False
+                    return await self.launch_prediction(numero, data, persist=False)
+
+        results = await asyncio.gather(*(_launch(numero, data) for numero, data in due))
+        launched = [(numero, data) for (numero, data), ok in zip(due, results) if ok]
+        if launched:
+            try:
+                self.store.put_many(launched)
+            except Exception as e:
+                print(f"❌ Erreur journalisation des lancements: {e}")
+        return len(launched)
+    
     def generate_suit_prediction(self) -> str:
         """Génère une prédiction au format 2K/2K"""
         # Formats possibles pour les prédictions automatiques
@@ -287,13 +664,16 @@ class PredictionScheduler:
         print(f"🃏 Comptage cartes: groupe1='{group1}'→{count1}, groupe2='{group2}'→{count2}")
         return count1 == 2 and count2 == 2
     
-    def verify_prediction_from_message(self, message_text: str, predicted_numbers: list) -> tuple:
+    def verify_prediction_from_message(self, message_text: str) -> tuple:
         """
         Vérifie une prédiction selon l'algorithme spécifié :
         1. Cherche le numéro exact (offset 0) → ✅0️⃣
         2. Cherche le numéro suivant (offset 1) → ✅1️⃣  
         3. Cherche le numéro +2 (offset 2) → ✅2️⃣
         4. Sinon → 📌❌
+        
+        Une seule recherche dans l'index de vérification par message.
+        Retourne (numéro de l'entrée, statut) ou (None, None).
         """
         import re
         
@@ -303,6 +683,12 @@ class PredictionScheduler:
             return None, None
         
         current_number = int(match.group(1))
+        numeros = self._targets.get(current_number)
+        if not numeros:
+            return None, None
+        numero = numeros[0]
+        predicted_num = self._game_number(numero)
+        offset = current_number - predicted_num
         print(f"🔍 Message reçu pour #N{current_number}")
         
         # Extrait les groupes de cartes entre parenthèses
@@ -313,100 +699,186 @@ class PredictionScheduler:
         
         group1, group2 = groups[0], groups[1]
         
-        # Vérifie si ce message correspond à une prédiction
-        for predicted_num in predicted_numbers:
-            # Offsets possibles : 0, 1, 2
-            for offset in range(3):
-                target_number = predicted_num + offset
-                
-                if current_number == target_number:
-                    print(f"🎯 Correspondance trouvée: prédiction N{predicted_num:03d} vs message N{current_number} (offset {offset})")
-                    
-                    # Vérifie la distribution des cartes
-                    if self.check_card_distribution(group1, group2):
-                        # Détermine le statut selon l'offset
-                        if offset == 0:
-                            status = "✅0️⃣"
-                        elif offset == 1:
-                            status = "✅1️⃣"
-                        else:  # offset == 2
-                            status = "✅2️⃣"
-                        
-                        print(f"✅ Prédiction réussie N{predicted_num:03d}: {status}")
-                        return predicted_num, status
-                    else:
-                        # Distribution incorrecte
-                        print(f"❌ Distribution incorrecte pour N{predicted_num:03d}")
-                        return predicted_num, "📌❌"
+        print(f"🎯 Correspondance trouvée: prédiction {numero} vs message N{current_number} (offset {offset})")
         
-        return None, None
-    
-    async def run_scheduler(self):
-        """Boucle principale du planificateur"""
-        print("🚀 Démarrage du planificateur automatique")
+        # Vérifie la distribution des cartes
+        if self.check_card_distribution(group1, group2):
+            # Détermine le statut selon l'offset
+            if offset == 0:
+                status = "✅0️⃣"
+            elif offset == 1:
+                status = "✅1️⃣"
+            else:  # offset == 2
+                status = "✅2️⃣"
+            
+            print(f"✅ Prédiction réussie {numero}: {status}")
+            return numero, status
         
-        # Charge ou génère la planification
+        # Distribution incorrecte
+        print(f"❌ Distribution incorrecte pour {numero}")
+        return numero, "📌❌"
+    
+    async def process_result(self, message_text: str) -> Optional[Tuple[str, str]]:
+        """
+        Traite un message de résultat: vérifie la prédiction automatique concernée
+        et met à jour son message. Retourne (numéro, statut) ou None.
+        La suite de la planification vient de extend_horizon (ou des règles cron).
+        """
+        numero, status = self.verify_prediction_from_message(message_text)
+        if not (numero and status):
+            return None
+        self.mark_verified(numero, status)
+        await self.update_prediction_message(numero, self.schedule_data[numero], status)
+        return numero, status
+
+    def mark_verified(self, numero: str, status: str):
+        """Enregistre le résultat d'une prédiction et la retire de l'index de vérification"""
+        data = self.schedule_data[numero]
+        if not data["verified"]:
+            self._verified_count += 1
+        data["verified"] = True
+        data["statut"] = status
+        self._unindex_targets(numero)
+        self.save_entry(numero)
+    
+    def _take_over(self):
+        """
+        Nouveau leader: repart de l'état persisté par l'ancien leader (en base si elle est
+        configurée, y compris les entrées lancées en attente de vérification)
+        """
         self.schedule_data = self.load_schedule()
         if not self.schedule_data:
             self.schedule_data = self.generate_daily_schedule()
             self.save_schedule(self.schedule_data)
+        self._reindex()
+        self._next_maintenance = self.clock.monotonic()
+
+    def _probe_leader(self) -> bool:
+        """Appel bloquant au verrou (base ou fichier), exécuté hors de la boucle d'événements"""
+        return self.leader.still_held() if self.is_leader else self.leader.try_acquire()
+
+    async def _check_leadership(self) -> bool:
+        """Confirme (au plus toutes les leader_check_interval s) ou tente d'obtenir le verrou"""
+        now = self.clock.monotonic()
+        if self.is_leader and (not self.leader_check_interval or now < self._next_leader_check):
+            return True
+        try:
+            held = await asyncio.get_running_loop().run_in_executor(None, self._probe_leader)
+        except Exception as e:
+            print(f"❌ Erreur verrou du planificateur: {e}")
+            self.is_leader = False
+            return False
+        if self.leader_check_interval:
+            self._next_leader_check = now + self.leader_check_interval
+        if self.is_leader:
+            if held:
+                return True
+            print("⚠️ Verrou du planificateur perdu - passage en attente")
+            self.is_leader = False
+            return False
+        if not held:
+            return False
+        print("👑 Verrou du planificateur obtenu - cette instance lance les prédictions")
+        self.is_leader = True
+        self._take_over()
+        return True
+
+    async def tick(self) -> float:
+        """
+        Une itération du planificateur: verrou, maintenance, lancements échus.
+        Retourne le délai (secondes) avant l'itération suivante.
+        """
+        if not await self._check_leadership():
+            # Instance en attente: nouvelle tentative dans quelques secondes
+            return LEADER_RETRY_SECONDS
+        # Archivage des entrées terminées et complément de l'horizon glissant
+        if self.clock.monotonic() >= self._next_maintenance:
+            await self.maintain(self.clock.now())
+            self._next_maintenance = self.clock.monotonic() + self.maintenance_interval.total_seconds()
+        
+        # Lance les prédictions arrivées à échéance
+        due = self.pop_due_launches()
+        if due:
+            await self.launch_due(due)
+        
+        # Règles cron: occurrence suivante pour chaque règle consommée
+        if self.rules:
+            self.ensure_rule_entries(self.clock.now())
+        
+        # Les vérifications automatiques sont maintenant gérées 
+        # directement dans handle_messages() lors de la réception des messages
+        
+        # Dort exactement jusqu'au prochain lancement (ou jusqu'à un ajout/arrêt), en temps monotone
+        delay = self.seconds_until_next_launch()
+        until_maintenance = max(0.0, self._next_maintenance - self.clock.monotonic())
+        delay = until_maintenance if delay is None else min(delay, until_maintenance)
+        # Contrôle régulier du verrou pour céder la main si la session est perdue
+        if self.leader_check_interval:
+            delay = min(delay, self.leader_check_interval)
+        return delay
+
+    async def run_scheduler(self):
+        """Boucle principale du planificateur (active seulement sur l'instance leader)"""
+        print("🚀 Démarrage du planificateur automatique")
         
         self.is_running = True
+        self._wakeup = asyncio.Event()
         
         while self.is_running:
             try:
-                current_time = self.get_current_time_slot()
-                
-                # Lance les prédictions en attente
-                pending_launches = self.get_pending_launches(current_time)
-                for numero, data in pending_launches:
-                    await self.launch_prediction(numero, data)
-                
-                # Les vérifications automatiques sont maintenant gérées 
-                # directement dans handle_messages() lors de la réception des messages
-                
-                # Attendre 30 secondes avant le prochain cycle
-                await asyncio.sleep(30)
+                # Effacé avant le calcul de l'échéance pour ne perdre aucun ajout concurrent
+                self._wakeup.clear()
+                delay = await self.tick()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
                 
             except Exception as e:
                 print(f"❌ Erreur dans le planificateur: {e}")
                 await asyncio.sleep(60)  # Attendre plus longtemps en cas d'erreur
+        
+        self.leader.release()
+        self.is_leader = False
     
     def stop_scheduler(self):
         """Arrête le planificateur"""
         self.is_running = False
+        self._notify()
         print("🛑 Planificateur arrêté")
     
     def get_schedule_status(self) -> Dict[str, Any]:
-        """Retourne le statut actuel de la planification"""
-        if not self.schedule_data:
-            return {"error": "Aucune planification chargée"}
-        
+        """Retourne le statut actuel de la planification (vide sur une instance en attente)"""
         total = len(self.schedule_data)
-        launched = sum(1 for data in self.schedule_data.values() if data["launched"])
-        verified = sum(1 for data in self.schedule_data.values() if data["verified"])
-        pending = total - launched
+        launched = self._launched_count
+        verified = self._verified_count
+        expired = self._expired_count
+        # Une entrée expirée n'a jamais été lancée et ne le sera plus
+        pending = total - launched - expired
         
         # Prochaine prédiction
-        current_time = self.get_current_time_slot()
         next_launch = None
-        for numero, data in self.schedule_data.items():
-            if not data["launched"] and data["heure_lancement"] > current_time:
-                next_launch = f"{numero} à {data['heure_lancement']}"
-                break
+        upcoming = self.upcoming_launches(1, after=self.clock.now())
+        if upcoming:
+            numero, launch_time = upcoming[0]
+            next_launch = f"{numero} à {launch_time.strftime('%H:%M')}"
         
         return {
             "total": total,
             "launched": launched,
             "verified": verified,
+            "expired": expired,
             "pending": pending,
             "next_launch": next_launch,
-            "is_running": self.is_running
+            "is_running": self.is_running,
+            "is_leader": self.is_leader
         }
     
-    def regenerate_schedule(self):
+    async def regenerate_schedule(self):
         """Régénère une nouvelle planification quotidienne"""
+        await self.archive_finished(self.clock.now())
         self.schedule_data = self.generate_daily_schedule()
+        self._reindex()
         self.save_schedule(self.schedule_data)
         print("🔄 Nouvelle planification générée")
 
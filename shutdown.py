@@ -0,0 +1,218 @@
+"""
+Graceful shutdown coordination for the webhook (Flask) and Telethon entry points.
+
+On SIGTERM the coordinator stops accepting new updates, waits for in-flight
+work (sends and edits) until a deadline, then runs the registered persistence
+hooks exactly once before the process exits.
+"""
+import os
+import signal
+import atexit
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Render laisse 30 s entre SIGTERM et SIGKILL
+DEFAULT_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', '20'))
+# Durée maximale des sauvegardes (hooks) côté asyncio, après le drain
+HOOKS_TIMEOUT = float(os.getenv('SHUTDOWN_HOOKS_TIMEOUT', '8'))
+
+
+class ShutdownCoordinator:
+    """Tracks in-flight work and runs persistence hooks on shutdown"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, hooks_timeout: float = HOOKS_TIMEOUT):
+        self.timeout = timeout
+        self.hooks_timeout = hooks_timeout
+        self.draining = False
+        self._inflight = 0
+        self._condition = threading.Condition()
+        self._hooks: List[Tuple[str, Callable[..., None], Optional[Callable[[], Any]]]] = []
+        self._finished = False
+        # Updates refusés après la sauvegarde de l'état (pas de nouvelle livraison côté Telethon)
+        self.dropped = 0
+        self._previous_handlers = {}
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def finished(self) -> bool:
+        """True once the persistence hooks have started: later work would not be saved"""
+        return self._finished
+
+    def record_dropped(self) -> int:
+        """Count an update refused after the hooks ran; returns the running total"""
+        with self._condition:
+            self.dropped += 1
+            return self.dropped
+
+    def register(self, name: str, hook: Callable[..., None],
+                 snapshot: Optional[Callable[[], Any]] = None) -> None:
+        """Register a state-persistence hook, run in registration order
+
+        With `snapshot`, the state is copied by snapshot() on the caller's
+        thread (the event loop for finish_async) before any hook runs, and
+        hook(copy) then only touches that copy.
+        """
+        self._hooks.append((name, hook, snapshot))
+
+    @contextmanager
+    def track(self):
+        """Mark a unit of work (an update, a send, an edit) as in flight"""
+        with self._condition:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._inflight -= 1
+                if self._inflight == 0:
+                    self._condition.notify_all()
+
+    def begin_drain(self) -> None:
+        if not self.draining:
+            self.draining = True
+            logger.info(f"🛑 Arrêt demandé - plus de nouveaux updates, {self._inflight} traitement(s) en cours")
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Block until no work is in flight or the timeout expires"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._inflight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    async def wait_idle_async(self, timeout: float) -> bool:
+        """Event-loop friendly variant of wait_idle"""
+        deadline = time.monotonic() + timeout
+        while self._inflight > 0:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def run_hooks(self) -> None:
+        """Run persistence hooks once; a failing hook does not stop the others"""
+        if self._finished:
+            return
+        self._finished = True
+        self._call_hooks(self._take_snapshots())
+
+    def _take_snapshots(self) -> List[Tuple[str, Callable[[], None]]]:
+        """Hooks ready to run; the snapshots are taken here, on the calling thread"""
+        calls = []
+        for name, hook, snapshot in self._hooks:
+            if snapshot is None:
+                calls.append((name, hook))
+                continue
+            try:
+                state = snapshot()
+            except Exception as e:
+                logger.error(f"❌ Arrêt - échec copie de l'état {name}: {e}")
+                continue
+            calls.append((name, lambda hook=hook, state=state: hook(state)))
+        return calls
+
+    def _call_hooks(self, calls: List[Tuple[str, Callable[[], None]]]) -> None:
+        for name, call in calls:
+            try:
+                call()
+                logger.info(f"💾 Arrêt - {name} sauvegardé")
+            except Exception as e:
+                logger.error(f"❌ Arrêt - échec sauvegarde {name}: {e}")
+
+    def finish(self) -> None:
+        """Drain and persist (synchronous entry points)"""
+        if self._finished:
+            return
+        self.begin_drain()
+        if not self.wait_idle(self.timeout):
+            logger.warning(f"⚠️ Arrêt - délai de {self.timeout}s dépassé, {self._inflight} traitement(s) abandonné(s)")
+        self.run_hooks()
+
+    async def finish_async(self) -> None:
+        """Drain and persist (asyncio entry points)"""
+        if self._finished:
+            return
+        self.begin_drain()
+        if not await self.wait_idle_async(self.timeout):
+            logger.warning(f"⚠️ Arrêt - délai de {self.timeout}s dépassé, {self._inflight} traitement(s) abandonné(s)")
+        if self._finished:
+            return
+        self._finished = True
+        # Copies de l'état prises ici, sur la boucle: les tâches encore en cours après un drain
+        # incomplet ne peuvent pas modifier ce que les hooks écrivent
+        calls = self._take_snapshots()
+        # Hooks bloquants (vidage du tampon d'écriture, fermeture du pool) hors de la boucle,
+        # qui continue de servir les updates (comptés comme ignorés) ; thread démon borné
+        # par hooks_timeout pour ne pas retarder la sortie au-delà du délai de la plateforme
+        loop = asyncio.get_running_loop()
+        done = asyncio.Event()
+
+        def target():
+            try:
+                self._call_hooks(calls)
+            finally:
+                try:
+                    loop.call_soon_threadsafe(done.set)
+                except RuntimeError:
+                    pass  # boucle déjà fermée
+
+        threading.Thread(target=target, name='shutdown-hooks', daemon=True).start()
+        try:
+            await asyncio.wait_for(done.wait(), self.hooks_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Arrêt - sauvegardes non terminées après {self.hooks_timeout}s, sortie quand même")
+
+    def install(self) -> None:
+        """Install SIGTERM/SIGINT handlers for a threaded or pre-fork WSGI server
+
+        Under gunicorn the worker's own handler is chained so the current
+        request completes and the worker exits normally; the atexit hook then
+        drains and persists. Without a previous handler the process exits here.
+        """
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._previous_handlers[signum] = signal.signal(signum, self._on_signal)
+            except ValueError:
+                # signal.signal n'est autorisé que dans le thread principal
+                logger.warning("⚠️ Gestionnaire de signaux non installé (hors thread principal)")
+                break
+        atexit.register(self.finish)
+
+    def _on_signal(self, signum, frame) -> None:
+        self.begin_drain()
+        previous = self._previous_handlers.get(signum)
+        if callable(previous):
+            previous(signum, frame)
+            return
+        self.finish()
+        raise SystemExit(0)
+
+    def install_async(self, loop: asyncio.AbstractEventLoop, on_shutdown: Callable[[], 'asyncio.Future']) -> None:
+        """Install SIGTERM/SIGINT handlers on an event loop
+
+        `on_shutdown` is scheduled once; it should call finish_async() and then
+        stop the main coroutine (e.g. disconnect the Telethon client).
+        """
+        def _handler():
+            if not self.draining:
+                self.begin_drain()
+                asyncio.ensure_future(on_shutdown())
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, _handler)
+            except (NotImplementedError, RuntimeError):
+                # Windows : pas de add_signal_handler
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(_handler))
@@ -0,0 +1,215 @@
+"""
+Virtual-clock simulation of the automatic prediction scheduler.
+
+Drives PredictionScheduler.tick() against a VirtualClock, a fake Telegram
+client and a fake predictor: launches, result messages, verifications and
+horizon top-ups run without real waiting. Every Telegram call advances the
+virtual clock by a modeled latency, so the reported launch lateness
+includes send time. Wall time is about 0.1 s per simulated day on the
+hourly horizon (a 30-day run takes a few seconds) and about 1 s per day
+with a cron rule firing every two minutes. Reports launch-time accuracy and
+throughput, e.g.:
+
+    python simulation.py --days 30 --seed 1
+    python simulation.py --days 1 --cron '*/2 * * * *' --lead 1
+"""
+import os
+import re
+import io
+import time
+import heapq
+import random
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from clock import VirtualClock
+from leader import FileLeaderLock
+from schedule_store import ScheduleArchive
+from schedule_rules import ScheduleRule, compile_rules
+from scheduler import PredictionScheduler
+
+SUITS = ['♠️', '♥️', '♦️', '♣️']
+VALUES = ['A', 'K', 'Q', 'J', '10', '9', '8', '7']
+# Durée (secondes) d'un appel Telegram: la latence entre dans le retard mesuré des lancements
+SEND_LATENCY = (0.05, 0.5)
+
+
+class FakeMessage:
+    def __init__(self, message_id: int):
+        self.id = message_id
+
+
+class FakeClient:
+    """Records sends and edits instead of calling Telegram; each call takes `latency` seconds of virtual time"""
+
+    def __init__(self, clock: VirtualClock, rng: Optional[random.Random] = None,
+                 latency: Tuple[float, float] = SEND_LATENCY):
+        self.clock = clock
+        self.rng = rng or random.Random(0)
+        self.latency = latency
+        self.sent = []
+        self.edits = 0
+
+    def _round_trip(self) -> None:
+        # Aller-retour Telegram modélisé: l'horloge avance pendant l'appel
+        self.clock.advance(self.rng.uniform(*self.latency))
+
+    async def send_message(self, chat_id: int, text: str) -> FakeMessage:
+        self._round_trip()
+        self.sent.append((self.clock.now(), text))
+        return FakeMessage(len(self.sent))
+
+    async def edit_message(self, chat_id: int, message_id: int, text: str) -> None:
+        self._round_trip()
+        self.edits += 1
+
+
+class FakePredictor:
+    """Just the state PredictionScheduler touches"""
+
+    def __init__(self):
+        self.prediction_status = {}
+        self.processed_messages = set()
+
+    def reset(self):
+        self.prediction_status.clear()
+        self.processed_messages.clear()
+
+
+def result_message(game_number: int, rng: random.Random, two_by_two: bool) -> str:
+    """Stat-channel style result, e.g. '#N1130. 5(K♠️10♦️) - 9(A♥️8♣️)'"""
+    def group(size: int) -> str:
+        return ''.join(rng.choice(VALUES) + rng.choice(SUITS) for _ in range(size))
+    first = group(2 if two_by_two else 3)
+    return f"#N{game_number}. {rng.randint(0, 9)}({first}) - {rng.randint(0, 9)}({group(2)})"
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def launches_per_day(sent, start: datetime, days: float) -> List[int]:
+    counts = [0] * max(1, int(-(-days // 1)))
+    for sent_at, _ in sent:
+        counts[min(len(counts) - 1, (sent_at - start).days)] += 1
+    return counts
+
+
+async def simulate(days: float = 1.0, seed: int = 0, start: Optional[datetime] = None,
+                   hit_rate: float = 0.7, verbose: bool = False,
+                   rules: Optional[List[ScheduleRule]] = None,
+                   latency: Tuple[float, float] = SEND_LATENCY) -> Dict[str, Any]:
+    """Run the scheduler for `days` of virtual time and return a report"""
+    rng = random.Random(seed)
+    random.seed(seed)  # generate_daily_schedule / extend_horizon tirent dans random
+    clock = VirtualClock(start or datetime(2025, 1, 6, 0, 0, 0))
+    start_at = clock.now()
+    client = FakeClient(clock, rng, latency)
+    predictor = FakePredictor()
+    end = clock.now() + timedelta(days=days)
+    # Messages de résultat à venir: (instant, séquence, texte)
+    results = []
+    counters = {'ticks': 0, 'results': 0, 'verified': 0}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        scheduler = PredictionScheduler(
+            client, predictor, -1001, -1002,
+            archive=ScheduleArchive(directory=os.path.join(workdir, 'archives')),
+            leader=FileLeaderLock(os.path.join(workdir, 'scheduler.lock')),
+            clock=clock,
+            schedule_file=os.path.join(workdir, 'prediction.yaml'),
+            rules=rules,
+        )
+        scheduler.leader_check_interval = 0
+        scheduler.launch_lateness = []
+        scheduler.is_running = True
+
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        wall_start = time.perf_counter()
+        with output:
+            sent_seen = 0
+            next_reset = clock.now().replace(hour=0, minute=0, second=0) + timedelta(days=1)
+            while clock.now() < end:
+                now = clock.now()
+                # Remise à zéro quotidienne du prédicteur (les numéros HHMM reviennent chaque jour)
+                if now >= next_reset:
+                    predictor.reset()
+                    next_reset += timedelta(days=1)
+
+                while results and results[0][0] <= now:
+                    _, _, text = heapq.heappop(results)
+                    counters['results'] += 1
+                    if await scheduler.process_result(text):
+                        counters['verified'] += 1
+
+                delay = await scheduler.tick()
+                counters['ticks'] += 1
+
+                # Chaque lancement produit un résultat 1 à 5 minutes plus tard, décalé de 0 à 2 jeux
+                for sent_at, text in client.sent[sent_seen:]:
+                    game_number = int(re.search(r"🔵(\d+)—", text).group(1))
+                    offset = rng.randint(0, 2)
+                    result_at = sent_at + timedelta(minutes=rng.uniform(1, 5) + offset)
+                    message = result_message(game_number + offset, rng, rng.random() < hit_rate)
+                    heapq.heappush(results, (result_at, counters['ticks'] * 1000 + offset, message))
+                sent_seen = len(client.sent)
+
+                wake_at = clock.now() + timedelta(seconds=delay)
+                if results:
+                    wake_at = min(wake_at, results[0][0])
+                clock.advance_to(min(wake_at, end))
+        wall = time.perf_counter() - wall_start
+
+        lateness = scheduler.launch_lateness
+        expired = sum(1 for data in scheduler.schedule_data.values() if data.get("expired"))
+        return {
+            'simulated_days': days,
+            'wall_seconds': round(wall, 3),
+            'ticks': counters['ticks'],
+            'launches': len(client.sent),
+            'result_messages': counters['results'],
+            'verified': counters['verified'],
+            # Lancements par jour simulé: doit rester stable d'un jour à l'autre
+            'launches_per_day': launches_per_day(client.sent, start_at, days),
+            'message_edits': client.edits,
+            'live_entries': len(scheduler.schedule_data),
+            'expired_live': expired,
+            'lateness_mean_s': round(sum(lateness) / len(lateness), 3) if lateness else 0.0,
+            'lateness_p99_s': round(_percentile(lateness, 0.99), 3),
+            'lateness_max_s': round(max(lateness), 3) if lateness else 0.0,
+            'launches_per_wall_second': round(len(client.sent) / wall, 1) if wall else 0.0,
+            'ticks_per_wall_second': round(counters['ticks'] / wall, 1) if wall else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation accélérée du planificateur automatique")
+    parser.add_argument('--days', type=float, default=1.0, help="durée simulée en jours")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hit-rate', type=float, default=0.7, help="part des résultats en 2/2 cartes")
+    parser.add_argument('--verbose', action='store_true', help="affiche les journaux du planificateur")
+    parser.add_argument('--cron', action='append', default=[],
+                        help="règle cron de l'heure de prédiction (répétable), ex. '*/5 * * * *'")
+    parser.add_argument('--lead', default="1-4", help="avance de lancement des règles, en minutes")
+    parser.add_argument('--latency', default="0.05-0.5", help="durée d'un appel Telegram, en secondes (min-max)")
+    args = parser.parse_args()
+
+    rules = compile_rules({'cron': cron, 'lead': args.lead} for cron in args.cron)
+    low, _, high = args.latency.partition('-')
+    latency = (float(low), float(high or low))
+    report = asyncio.run(simulate(args.days, args.seed, hit_rate=args.hit_rate, verbose=args.verbose,
+                                  rules=rules, latency=latency))
+    print("📊 Simulation du planificateur")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
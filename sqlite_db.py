@@ -0,0 +1,449 @@
+"""
+Embedded SQLite implementation of the DatabaseManager API.
+
+Selected by init_database() when DATABASE_URL starts with sqlite:// (e.g.
+sqlite:///bot_data.db, sqlite:////data/bot.db or sqlite:///:memory:). Meant
+for single-instance deployments: no server, no network, durable writes.
+
+The database runs in WAL mode with synchronous=NORMAL, so readers never block
+the writer and a commit is an append to the WAL. Each executor thread keeps
+its own connection whose statement cache reuses compiled statements, and
+multi-row writes go through executemany inside one IMMEDIATE transaction.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+
+from migrations import migrate_sqlite
+from models import (
+    AUTO_PREDICTION_COLUMNS, MESSAGE_LOG_RETENTION_DAYS, PREDICTION_RETENTION_DAYS,
+    RETENTION_BATCH, STORE_MESSAGE_CONTENT, ConfigCache, RecentHashes, decode_config, group_daily,
+    group_operations, live_entry_day, message_hash, prediction_outcome, stat_rows, status_deltas, summarize_totals
+)
+
+# Instructions compilées gardées par connexion
+STATEMENT_CACHE_SIZE = 256
+# Attente maximale d'un verrou d'écriture tenu par un autre processus (ms)
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+# Intervalle de vérification des écritures d'autres processus (cache de configuration)
+CONFIG_POLL_SECONDS = 1.0
+
+
+def sqlite_path(url: str) -> str:
+    """sqlite:///relatif.db → relatif.db ; sqlite:////abs.db → /abs.db"""
+    path = url.split('://', 1)[1] if '://' in url else url.split(':', 1)[1]
+    return path[1:] if path.startswith('/') else path
+
+
+class SQLiteDatabaseManager:
+    """Gestionnaire de base de données SQLite (même API que models.DatabaseManager)"""
+
+    def __init__(self, path: str):
+        if path in ('', ':memory:'):
+            # Base mémoire partagée entre les connexions des threads
+            self.path, self._uri = f"file:bot_memdb_{id(self)}?mode=memory&cache=shared", True
+        else:
+            self.path, self._uri = path, False
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Même rôle que dans DatabaseManager (diff de la planification, doublons récents)
+        self._saved_schedule: Optional[Dict[str, tuple]] = None
+        self._saved_schedule_day: Optional[str] = None
+        self._schedule_lock = threading.Lock()
+        self._recent_messages = RecentHashes()
+        # Gardée ouverte: une base mémoire disparaît avec sa dernière connexion
+        self._keeper = self._local.conn = self._connect()
+        self.init_tables()
+        # PRAGMA data_version change quand une autre connexion a écrit: le cache est alors vidé
+        self._config = ConfigCache()
+        self._watcher = self._connect()
+        self._watcher_lock = threading.Lock()
+        self._data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+        self._next_config_poll = time.monotonic() + CONFIG_POLL_SECONDS
+        print(f"✅ Base de données SQLite initialisée ({path or ':memory:'})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, uri=self._uri, isolation_level=None,
+            check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connexion propre au thread appelant (mode autocommit)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Transaction d'écriture: `with db.connection() as conn:` (COMMIT, ou ROLLBACK sur erreur)"""
+        conn = self._conn()
+        # IMMEDIATE: le verrou d'écriture est pris d'emblée, pas de blocage mutuel lecture → écriture
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        """Ferme toutes les connexions"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def init_tables(self):
+        """Applique les migrations de schéma en attente (voir migrations.py)"""
+        migrate_sqlite(self._conn())
+
+    def set_config(self, key: str, value: Any):
+        """Sauvegarde une valeur de configuration"""
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO bot_config (key, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (key)
+                DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """, (key, json.dumps(value) if isinstance(value, (dict, list)) else str(value)))
+        self._config.invalidate(key)
+
+    def _poll_config_changes(self):
+        """Au plus une fois par CONFIG_POLL_SECONDS: vide le cache si la base a été modifiée ailleurs"""
+        now = time.monotonic()
+        if now < self._next_config_poll or not self._watcher_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_config_poll = now + CONFIG_POLL_SECONDS
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._data_version = version
+                self._config.invalidate()
+        finally:
+            self._watcher_lock.release()
+
+    def _load_config(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM bot_config WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else ConfigCache.MISSING
+
+    def get_config(self, key: str, default=None):
+        """Récupère une valeur de configuration (servie depuis la mémoire après la première lecture)"""
+        self._poll_config_changes()
+        return decode_config(self._config.get(key, lambda: self._load_config(key)), default)
+
+    def save_prediction(self, game_number: int, suit_combination: str,
+                       message_id: Optional[int] = None, chat_id: Optional[int] = None,
+                       prediction_type: str = 'manual'):
+        """Sauvegarde une prédiction manuelle"""
+        self.write_predictions([('save', (game_number, suit_combination, message_id, chat_id, prediction_type))])
+
+    def update_prediction_status(self, game_number: int, status: str):
+        """Met à jour le statut d'une prédiction"""
+        self.write_predictions([('status', (game_number, status))])
+
+    def write_predictions(self, operations: List[tuple]):
+        """Applique en une transaction une suite d'écritures (voir DatabaseManager.write_predictions)"""
+        with self.connection() as conn:
+            deltas = Counter()
+            for kind, rows in group_operations(operations):
+                if kind == 'save':
+                    for row in rows:
+                        cur = conn.execute("""
+                            INSERT OR IGNORE INTO predictions
+                            (game_number, suit_combination, message_id, chat_id, prediction_type)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, row)
+                        if cur.rowcount:
+                            day, status = conn.execute(
+                                "SELECT date(created_at), status FROM predictions WHERE id = ?", (cur.lastrowid,)
+                            ).fetchone()
+                            deltas[(day, prediction_outcome(status))] += 1
+                else:
+                    for game_number, status in rows:
+                        # Transaction IMMEDIATE: les anciens statuts ne peuvent pas changer d'ici l'UPDATE
+                        changed = conn.execute(
+                            "SELECT date(created_at), status, ? FROM predictions WHERE game_number = ?",
+                            (status, game_number)
+                        ).fetchall()
+                        conn.execute("""
+                            UPDATE predictions
+                            SET status = ?, verified_at = CURRENT_TIMESTAMP
+                            WHERE game_number = ?
+                        """, (status, game_number))
+                        deltas.update(status_deltas(changed))
+            self._apply_stat_deltas(conn, deltas)
+
+    def _apply_stat_deltas(self, conn, deltas: Counter):
+        """Reporte des deltas dans prediction_stats et prediction_totals (même transaction)"""
+        daily, totals = stat_rows(deltas)
+        conn.executemany("""
+            INSERT INTO prediction_stats (day, outcome, total) VALUES (?, ?, ?)
+            ON CONFLICT (day, outcome) DO UPDATE SET total = prediction_stats.total + excluded.total
+        """, daily)
+        conn.executemany("""
+            INSERT INTO prediction_totals (outcome, total) VALUES (?, ?)
+            ON CONFLICT (outcome) DO UPDATE SET total = prediction_totals.total + excluded.total
+        """, totals)
+
+    def get_pending_predictions(self) -> List[Dict]:
+        """Récupère les prédictions en attente"""
+        rows = self._conn().execute("""
+            SELECT * FROM predictions
+            WHERE status = '⌛'
+            ORDER BY created_at ASC
+        """).fetchall()
+        return [dict(row) for row in rows]
+
+    def _auto_prediction_row(self, numero: str, data: Dict[str, Any]) -> tuple:
+        """Valeurs comparables d'une entrée (booléens stockés en 0/1)"""
+        return (
+            numero, data.get('lanceur'), data.get('heure_lancement'),
+            data.get('heure_prediction'), data.get('statut', '⌛'),
+            data.get('message_id'), data.get('chat_id'),
+            int(bool(data.get('launched', False))), int(bool(data.get('verified', False))),
+            data.get('prediction_format')
+        )
+
+    def save_auto_prediction_schedule(self, schedule_data: Dict[str, Any]):
+        """
+        Synchronise la planification du jour: seules les lignes nouvelles ou modifiées
+        sont écrites, les lignes retirées supprimées, le tout dans une transaction.
+        Le jour est date('now') de SQLite (UTC), comme CURRENT_DATE / CURRENT_TIMESTAMP
+        dans le schéma et partout ailleurs dans ce module.
+        """
+        rows = {numero: self._auto_prediction_row(numero, data) for numero, data in schedule_data.items()}
+        with self._schedule_lock:
+            try:
+                with self.connection() as conn:
+                    day = conn.execute("SELECT date('now')").fetchone()[0]
+                    saved = self._saved_schedule if self._saved_schedule_day == day else None
+                    if saved is None:
+                        saved = {
+                            row[0]: tuple(row) for row in conn.execute(f"""
+                                SELECT {', '.join(AUTO_PREDICTION_COLUMNS)} FROM auto_predictions
+                                WHERE created_at = ?
+                            """, (day,))
+                        }
+                    changed = [row for numero, row in rows.items() if saved.get(numero) != row]
+                    removed = [(day, numero) for numero in saved if numero not in rows]
+                    if changed:
+                        conn.executemany(f"""
+                            INSERT INTO auto_predictions ({', '.join(AUTO_PREDICTION_COLUMNS)}, created_at)
+                            VALUES ({', '.join('?' * (len(AUTO_PREDICTION_COLUMNS) + 1))})
+                            ON CONFLICT (numero, created_at) DO UPDATE SET
+                                {', '.join(f"{column} = excluded.{column}" for column in AUTO_PREDICTION_COLUMNS[1:])}
+                        """, [row + (day,) for row in changed])
+                    if removed:
+                        conn.executemany(
+                            "DELETE FROM auto_predictions WHERE created_at = ? AND numero = ?", removed
+                        )
+            except Exception:
+                self._saved_schedule = None
+                raise
+            self._saved_schedule = rows
+            self._saved_schedule_day = day
+
+    def load_auto_prediction_schedule(self) -> Dict[str, Any]:
+        """Charge la planification automatique du jour"""
+        rows = self._conn().execute("""
+            SELECT * FROM auto_predictions
+            WHERE created_at = date('now')
+            ORDER BY heure_lancement
+        """).fetchall()
+        return {
+            row['numero']: {
+                'lanceur': row['lanceur'],
+                'heure_lancement': row['heure_lancement'],
+                'heure_prediction': row['heure_prediction'],
+                'statut': row['statut'],
+                'message_id': row['message_id'],
+                'chat_id': row['chat_id'],
+                'launched': bool(row['launched']),
+                'verified': bool(row['verified']),
+                'prediction_format': row['prediction_format']
+            }
+            for row in rows
+        }
+
+    def archive_auto_predictions(self, entries: List[tuple]):
+        """Archive des prédictions automatiques terminées (numero, data), datées du jour du jeu"""
+        with self.connection() as conn:
+            conn.executemany("""
+                INSERT INTO auto_predictions
+                (numero, lanceur, heure_lancement, heure_prediction, statut,
+                 message_id, chat_id, launched, verified, prediction_format, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, date('now')))
+                ON CONFLICT (numero, created_at) DO UPDATE SET
+                    statut = excluded.statut,
+                    message_id = excluded.message_id,
+                    chat_id = excluded.chat_id,
+                    launched = excluded.launched,
+                    verified = excluded.verified,
+                    prediction_format = excluded.prediction_format,
+                    live = 0
+            """, [
+                self._auto_prediction_row(numero, data)
+                + ((data.get('prediction_at') or '')[:10] or None,)
+                for numero, data in entries
+            ])
+
+    def update_auto_prediction(self, numero: str, updates: Dict[str, Any]):
+        """Met à jour une prédiction automatique (colonnes connues uniquement)"""
+        unknown = set(updates) - set(AUTO_PREDICTION_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(sorted(unknown))}")
+        if not updates:
+            return
+        # Noms de colonnes vérifiés ci-dessus
+        set_clause = ", ".join(f"{column} = ?" for column in updates)
+        with self._schedule_lock:
+            with self.connection() as conn:
+                conn.execute(
+                    f"UPDATE auto_predictions SET {set_clause} WHERE numero = ? AND created_at = date('now')",
+                    list(updates.values()) + [numero]
+                )
+            if self._saved_schedule is not None:
+                self._saved_schedule.pop(numero, None)
+
+    def _upsert_live_entries(self, conn, entries: List[tuple]):
+        conn.executemany(f"""
+            INSERT INTO auto_predictions ({', '.join(AUTO_PREDICTION_COLUMNS)}, created_at, entry, live)
+            VALUES ({', '.join('?' * len(AUTO_PREDICTION_COLUMNS))}, COALESCE(?, date('now')), ?, 1)
+            ON CONFLICT (numero, created_at) DO UPDATE SET
+                {', '.join(f"{column} = excluded.{column}" for column in AUTO_PREDICTION_COLUMNS[1:])},
+                entry = excluded.entry,
+                live = 1
+        """, [
+            self._auto_prediction_row(numero, data) + (live_entry_day(data), json.dumps(data))
+            for numero, data in entries
+        ])
+
+    def put_live_entries(self, entries: List[tuple]):
+        """Enregistre l'état courant d'entrées de la planification en cours (numero, data)"""
+        with self.connection() as conn:
+            self._upsert_live_entries(conn, entries)
+
+    def delete_live_entries(self, numeros: List[str]):
+        """Retire des entrées de la planification en cours (les lignes archivées restent)"""
+        with self.connection() as conn:
+            conn.executemany(
+                "DELETE FROM auto_predictions WHERE live AND numero = ?", [(numero,) for numero in numeros]
+            )
+
+    def replace_live_schedule(self, entries: List[tuple]):
+        """Remplace toute la planification en cours, en une transaction"""
+        with self.connection() as conn:
+            conn.execute("DELETE FROM auto_predictions WHERE live")
+            self._upsert_live_entries(conn, entries)
+
+    def load_live_schedule(self) -> Dict[str, Any]:
+        """Planification en cours, telle que l'a laissée le dernier leader"""
+        rows = self._conn().execute(
+            "SELECT numero, entry FROM auto_predictions WHERE live AND entry IS NOT NULL"
+        ).fetchall()
+        return {row['numero']: json.loads(row['entry']) for row in rows}
+
+    def claim_message(self, message_content: str, channel_id: int) -> bool:
+        """True si le message est nouveau (à traiter), False s'il a déjà été traité"""
+        digest = message_hash(message_content, channel_id)
+        if self._recent_messages.seen(digest):
+            return False
+        content = message_content if STORE_MESSAGE_CONTENT else None
+        with self.connection() as conn:
+            claimed = conn.execute("""
+                INSERT OR IGNORE INTO message_log (message_hash, channel_id, content)
+                VALUES (?, ?, ?)
+            """, (digest, channel_id, content)).rowcount == 1
+        self._recent_messages.add(digest)
+        return claimed
+
+    def is_message_processed(self, message_content: str, channel_id: int) -> bool:
+        """Vérifie si un message a déjà été traité (préférer claim_message)"""
+        digest = message_hash(message_content, channel_id)
+        if self._recent_messages.seen(digest):
+            return True
+        processed = self._conn().execute(
+            "SELECT 1 FROM message_log WHERE message_hash = ?", (digest,)
+        ).fetchone() is not None
+        if processed:
+            self._recent_messages.add(digest)
+        return processed
+
+    def mark_message_processed(self, message_content: str, channel_id: int):
+        """Marque un message comme traité"""
+        self.claim_message(message_content, channel_id)
+
+    def prune_history(self, message_days: int = MESSAGE_LOG_RETENTION_DAYS,
+                      prediction_days: int = PREDICTION_RETENTION_DAYS,
+                      batch: int = RETENTION_BATCH) -> Dict[str, int]:
+        """Applique les fenêtres de rétention (voir DatabaseManager.prune_history)"""
+        result = {'messages': 0, 'predictions': 0}
+        if message_days > 0:
+            while True:
+                with self.connection() as conn:
+                    count = conn.execute("""
+                        DELETE FROM message_log WHERE id IN (
+                            SELECT id FROM message_log
+                            WHERE processed_at < datetime('now', ?)
+                            LIMIT ?
+                        )
+                    """, (f"-{message_days} days", batch)).rowcount
+                result['messages'] += count
+                if count < batch:
+                    break
+        if prediction_days > 0:
+            while True:
+                with self.connection() as conn:
+                    count = conn.execute("""
+                        DELETE FROM predictions WHERE id IN (
+                            SELECT id FROM predictions
+                            WHERE created_at < datetime('now', ?)
+                            LIMIT ?
+                        )
+                    """, (f"-{prediction_days} days", batch)).rowcount
+                result['predictions'] += count
+                if count < batch:
+                    break
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du bot"""
+        conn = self._conn()
+        manual_stats = summarize_totals(conn.execute("SELECT outcome, total FROM prediction_totals"))
+        auto_stats = conn.execute("""
+            SELECT
+                COUNT(*) as total,
+                COUNT(CASE WHEN launched THEN 1 END) as launched,
+                COUNT(CASE WHEN verified THEN 1 END) as verified
+            FROM auto_predictions
+            WHERE created_at = date('now')
+        """).fetchone()
+        return {
+            'manual': manual_stats,
+            'auto': dict(auto_stats) if auto_stats else {}
+        }
+
+    def get_daily_stats(self, days: int = 30) -> Dict[str, Dict[str, int]]:
+        """Prédictions par jour et par issue sur les `days` derniers jours"""
+        return group_daily(self._conn().execute("""
+            SELECT day, outcome, total FROM prediction_stats
+            WHERE day > date('now', ?)
+            ORDER BY day
+        """, (f"-{days} days",)))
@@ -0,0 +1,17 @@
+import pytest
+
+from config import Config, DEFAULT_BOT_KEY
+
+
+def test_bot_tokens_are_parsed_with_optional_source_channel():
+    bots = Config._parse_bot_tokens('a=1:AAA@-1001, b=2:BBB')
+    assert bots == {
+        'a': {'token': '1:AAA', 'source_channel_id': -1001},
+        'b': {'token': '2:BBB', 'source_channel_id': None},
+    }
+
+
+@pytest.mark.parametrize('raw', [f'{DEFAULT_BOT_KEY}=1:AAA', 'a=1:AAA,a=2:BBB'])
+def test_bot_tokens_reject_keys_that_would_replace_another_bot(raw):
+    with pytest.raises(ValueError):
+        Config._parse_bot_tokens(raw)
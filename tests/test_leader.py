@@ -0,0 +1,61 @@
+import models
+from leader import FileLeaderLock, PostgresLeaderLock, make_leader_lock
+
+
+class RecordingConnection:
+    """Connexion minimale: enregistre les requêtes, pg_try_advisory_lock réussit"""
+
+    def __init__(self, **options):
+        self.options = options
+        self.statements = []
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self.statements.append((' '.join(statement.split()), params))
+
+    def fetchone(self):
+        return (True,)
+
+    def close(self):
+        self.closed = True
+
+
+def test_lock_session_uses_tcp_keepalives_on_both_sides():
+    manager = object.__new__(models.DatabaseManager)
+    manager.get_connection = RecordingConnection
+    lock = PostgresLeaderLock(manager, 'test')
+    assert lock.try_acquire()
+    conn = lock._conn
+    assert conn.options == {
+        'keepalives': 1, 'keepalives_idle': models.LOCK_KEEPALIVE_IDLE,
+        'keepalives_interval': models.LOCK_KEEPALIVE_INTERVAL, 'keepalives_count': models.LOCK_KEEPALIVE_COUNT,
+    }
+    settings, acquire = conn.statements
+    assert "set_config('tcp_keepalives_idle'" in settings[0]
+    assert settings[1] == (str(models.LOCK_KEEPALIVE_IDLE), str(models.LOCK_KEEPALIVE_INTERVAL),
+                           str(models.LOCK_KEEPALIVE_COUNT))
+    assert acquire == ("SELECT pg_try_advisory_lock(%s)", (lock.key,))
+    assert conn.autocommit
+    assert lock.still_held()
+    lock.release()
+    assert conn.closed and not lock.held
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    first, second = FileLeaderLock(str(tmp_path / 'l')), FileLeaderLock(str(tmp_path / 'l'))
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release()
+    assert isinstance(make_leader_lock(None, path=str(tmp_path / 'l')), FileLeaderLock)
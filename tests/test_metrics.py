@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from metrics import Counter, Histogram
+
+
+def _run_threads(count, target):
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+def test_counter_sums_shards_across_threads():
+    counter = Counter('test_total', 'test', ('kind',))
+    counter.inc(kind='a')
+    _run_threads(20, lambda: counter.inc(2, kind='a'))
+    assert counter.value(kind='a') == 41
+
+
+def test_dead_thread_shards_are_retired():
+    counter = Counter('test_retired_total', 'test')
+    _run_threads(200, counter.inc)
+    counter.inc()
+    # Un shard vivant (le thread courant), les 200 autres repliés dans le shard retiré
+    assert len(counter._shards._live) == 1
+    assert counter.value() == 201
+
+
+def test_histogram_retired_cells_are_merged():
+    histogram = Histogram('test_seconds', 'test', buckets=(0.1, 1.0))
+    _run_threads(10, lambda: histogram.observe(0.05))
+    _run_threads(5, lambda: histogram.observe(5.0))
+    cell = histogram.values()[()]
+    assert cell[:3] == [10, 0, 5]
+    assert cell[-1] == pytest.approx(10 * 0.05 + 5 * 5.0)
+    lines = histogram.collect()
+    assert 'test_seconds_count 15' in lines
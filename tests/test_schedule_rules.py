@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+
+from schedule_rules import ScheduleRule, compile_rules
+
+# Lundi
+MONDAY = datetime(2025, 1, 6, 12, 0, 30)
+
+
+def test_next_after_is_strictly_after_and_minute_aligned():
+    rule = ScheduleRule('r', '*/15 * * * *', lead=1)
+    assert rule.next_after(datetime(2025, 1, 6, 12, 0)) == datetime(2025, 1, 6, 12, 15)
+    assert rule.next_after(MONDAY) == datetime(2025, 1, 6, 12, 15)
+    assert rule.next_after(datetime(2025, 1, 6, 23, 50)) == datetime(2025, 1, 7, 0, 0)
+
+
+def test_steps_lists_and_ranges():
+    rule = ScheduleRule('r', '5,40 9-17/4 * * *', lead=1)
+    fires = [fire for fire, _ in zip(rule.iter_after(datetime(2025, 1, 6, 8, 0)), range(6))]
+    assert [(fire.hour, fire.minute) for fire in fires] == [(9, 5), (9, 40), (13, 5), (13, 40), (17, 5), (17, 40)]
+
+
+def test_day_of_month_or_weekday_when_both_are_restricted():
+    # Le 15 du mois OU le dimanche (0 et 7 = dimanche)
+    rule = ScheduleRule('r', '0 0 15 * 0', lead=1)
+    fires = [fire.date() for fire, _ in zip(rule.iter_after(datetime(2025, 1, 10)), range(3))]
+    assert [(day.day, day.weekday()) for day in fires] == [(12, 6), (15, 2), (19, 6)]
+    assert ScheduleRule('r', '0 0 * * 7', lead=1).next_after(MONDAY) == datetime(2025, 1, 12)
+
+
+def test_month_skipping_and_impossible_dates():
+    rule = ScheduleRule('r', '0 8 1 3,9 *', lead=1)
+    assert rule.next_after(datetime(2025, 3, 2)) == datetime(2025, 9, 1, 8, 0)
+    assert rule.next_after(datetime(2025, 9, 2)) == datetime(2026, 3, 1, 8, 0)
+    assert ScheduleRule('r', '0 0 30 2 *', lead=1).next_after(MONDAY) is None
+
+
+def test_next_launch_is_never_born_overdue():
+    rule = ScheduleRule('r', '*/5 * * * *', lead=4)
+    fire, lead = rule.next_launch(MONDAY)
+    # 12:05 se lancerait à 12:01, déjà au plus tôt à now + 4 min ; 12:05 reste valide
+    assert (fire, lead) == (datetime(2025, 1, 6, 12, 5), 4)
+    fire, _ = rule.next_launch(datetime(2025, 1, 6, 12, 2))
+    assert fire == datetime(2025, 1, 6, 12, 10)
+    fire, _ = rule.next_launch(MONDAY, after=datetime(2025, 1, 6, 12, 30))
+    assert fire == datetime(2025, 1, 6, 12, 35)
+
+
+@pytest.mark.parametrize('cron, period', [
+    ('* * * * *', 1),
+    ('*/10 * * * *', 10),
+    ('50 9,10 * * *', 60),
+    ('0,50 * * * *', 10),
+    ('0 12 * * *', 1440),
+])
+def test_lead_must_be_shorter_than_the_period(cron, period):
+    assert ScheduleRule('r', cron, lead=0).shortest_period() == period
+    ScheduleRule('r', cron, lead=period - 1)
+    with pytest.raises(ValueError):
+        ScheduleRule('r', cron, lead=f"0-{period}")
+
+
+@pytest.mark.parametrize('spec', [
+    {'cron': '* * * *'},
+    {'cron': '60 * * * *'},
+    {'cron': '*/0 * * * *'},
+    {'cron': '0 * * * *', 'lead': '4-1'},
+])
+def test_invalid_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        compile_rules([spec])
+
+
+def test_compile_rules_names_and_default_lead():
+    rules = compile_rules([{'cron': '0 * * * *'}, {'name': 'soir', 'cron': '*/10 18-23 * * 1-5', 'lead': 2}])
+    assert [rule.name for rule in rules] == ['regle1', 'soir']
+    assert (rules[0].lead_min, rules[0].lead_max) == (1, 4)
+    assert (rules[1].lead_min, rules[1].lead_max) == (2, 2)
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from clock import VirtualClock
+from leader import FileLeaderLock
+from schedule_store import DatabaseScheduleStore, ScheduleArchive, ScheduleStore, make_schedule_store
+from scheduler import PredictionScheduler
+from simulation import FakeClient, FakePredictor
+from sqlite_db import SQLiteDatabaseManager
+
+START = datetime(2025, 1, 6, 12, 0, 0)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'bot.db')
+
+
+def make_scheduler(tmp_path, db, name: str) -> PredictionScheduler:
+    """Une instance sur son propre « hôte »: fichiers locaux distincts, base partagée"""
+    clock = VirtualClock(START)
+    return PredictionScheduler(
+        FakeClient(clock), FakePredictor(), -1001, -1002,
+        archive=ScheduleArchive(db),
+        leader=FileLeaderLock(str(tmp_path / f'{name}.lock')),
+        clock=clock,
+        schedule_file=str(tmp_path / f'{name}.yaml'),
+        store=make_schedule_store(db, str(tmp_path / f'{name}.yaml')),
+    )
+
+
+def test_new_leader_resumes_the_previous_leaders_schedule(tmp_path, db_path):
+    first_db, second_db = SQLiteDatabaseManager(db_path), SQLiteDatabaseManager(db_path)
+    try:
+        first = make_scheduler(tmp_path, first_db, 'a')
+        first._take_over()
+        numero = min(first.schedule_data, key=lambda n: first.launch_at(first.schedule_data[n]))
+        assert asyncio.run(first.launch_prediction(numero, first.schedule_data[numero]))
+        first.store.flush()
+
+        second = make_scheduler(tmp_path, second_db, 'b')
+        second._take_over()
+        assert second.schedule_data == first.schedule_data
+        # L'entrée lancée par l'ancien leader reste vérifiable par le nouveau
+        assert numero in second._targets[second._game_number(numero)]
+        assert second.get_schedule_status()["launched"] == 1
+    finally:
+        first_db.close()
+        second_db.close()
+
+
+def test_archived_entries_leave_the_live_schedule(tmp_path, db_path):
+    db = SQLiteDatabaseManager(db_path)
+    try:
+        scheduler = make_scheduler(tmp_path, db, 'a')
+        scheduler._take_over()
+        numero = next(iter(scheduler.schedule_data))
+        scheduler.mark_verified(numero, '✅0️⃣')
+        assert asyncio.run(scheduler.archive_finished(START)) == 1
+        scheduler.store.flush()
+        live = db.load_live_schedule()
+        assert numero not in live and len(live) == len(scheduler.schedule_data)
+        archived = db._conn().execute(
+            "SELECT statut, live FROM auto_predictions WHERE numero = ?", (numero,)
+        ).fetchone()
+        assert tuple(archived) == ('✅0️⃣', 0)
+    finally:
+        db.close()
+
+
+def test_local_schedule_is_imported_once_into_an_empty_database(tmp_path, db_path):
+    legacy = ScheduleStore(str(tmp_path / 'prediction.yaml'))
+    legacy.replace_all({'N1305': {'statut': '⌛', 'launched': False, 'verified': False,
+                                  'prediction_at': '2025-01-06 13:05:00', 'launch_at': '2025-01-06 13:02:00'}})
+    db = SQLiteDatabaseManager(db_path)
+    try:
+        store = DatabaseScheduleStore(db, legacy=legacy)
+        assert set(store.load()) == {'N1305'}
+        store.flush()
+        assert set(db.load_live_schedule()) == {'N1305'}
+        store.close()
+    finally:
+        db.close()
+
+
+def test_without_database_the_local_store_is_kept(tmp_path):
+    assert isinstance(make_schedule_store(None, str(tmp_path / 'prediction.yaml')), ScheduleStore)
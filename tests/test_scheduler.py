@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from clock import VirtualClock
+from leader import FileLeaderLock
+from schedule_store import ScheduleArchive
+from scheduler import PredictionScheduler
+from simulation import FakeClient, FakePredictor
+
+START = datetime(2025, 1, 6, 12, 0, 0)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    clock = VirtualClock(START)
+    scheduler = PredictionScheduler(
+        FakeClient(clock), FakePredictor(), -1001, -1002,
+        archive=ScheduleArchive(directory=str(tmp_path / 'archives')),
+        leader=FileLeaderLock(str(tmp_path / 'scheduler.lock')),
+        clock=clock,
+        schedule_file=str(tmp_path / 'prediction.yaml'),
+    )
+    scheduler.launch_grace = 60
+    return scheduler
+
+
+def add(scheduler, launch_in: float, lead_minutes: int = 4) -> str:
+    """Entrée lancée dans `launch_in` secondes, jeu cible lead_minutes plus tard"""
+    target = scheduler.clock.now() + timedelta(seconds=launch_in, minutes=lead_minutes)
+    entry = scheduler.make_entry(target, lead_minutes, scheduler.clock.now())
+    return scheduler._insert_entry(f"N{target.hour:02d}{target.minute:02d}", entry)
+
+
+def test_launch_is_due_exactly_at_its_deadline(scheduler):
+    numero = add(scheduler, 90)
+    assert scheduler.seconds_until_next_launch() == 90
+    scheduler.clock.advance(89)
+    assert scheduler.pop_due_launches() == []
+    scheduler.clock.advance(1)
+    assert [n for n, _ in scheduler.pop_due_launches()] == [numero]
+
+
+def test_late_launch_is_caught_up_within_grace(scheduler):
+    numero = add(scheduler, 30)
+    scheduler.clock.advance(30 + 45)
+    assert [n for n, _ in scheduler.pop_due_launches()] == [numero]
+    assert not scheduler.schedule_data[numero].get("expired")
+
+
+def test_launch_beyond_grace_expires(scheduler):
+    numero = add(scheduler, 30)
+    scheduler.clock.advance(30 + 61)
+    assert scheduler.pop_due_launches() == []
+    data = scheduler.schedule_data[numero]
+    assert data["expired"] and data["statut"] == "⏭️"
+    assert scheduler.seconds_until_next_launch() is None
+
+
+def test_launch_after_target_game_expires_even_within_grace(scheduler):
+    scheduler.launch_grace = 3600
+    numero = add(scheduler, 30, lead_minutes=1)
+    scheduler.clock.advance(30 + 61)
+    assert scheduler.pop_due_launches() == []
+    assert scheduler.schedule_data[numero]["expired"]
+
+
+@pytest.mark.parametrize('step', [3600, -3600])
+def test_wall_clock_step_neither_bursts_nor_skips(scheduler, step):
+    first, second = add(scheduler, 60), add(scheduler, 120)
+    scheduler.clock.step_wall(step)
+    assert scheduler.pop_due_launches() == []
+    assert scheduler.seconds_until_next_launch() == 60
+    scheduler.clock.advance(60)
+    assert [n for n, _ in scheduler.pop_due_launches()] == [first]
+    scheduler.clock.advance(60)
+    assert [n for n, _ in scheduler.pop_due_launches()] == [second]
+
+
+def test_deadlines_survive_a_rebuild_after_a_wall_clock_step(scheduler):
+    numero = add(scheduler, 60)
+    scheduler.clock.step_wall(-600)
+    scheduler._reindex()
+    assert scheduler.seconds_until_next_launch() == 60
+    assert scheduler.upcoming_launches(1) == [(numero, START + timedelta(seconds=60))]
+
+
+def test_status_counts_expired_entries_apart_from_pending(scheduler):
+    add(scheduler, 30)
+    add(scheduler, 600)
+    scheduler.clock.advance(30 + 61)
+    scheduler.pop_due_launches()
+    status = scheduler.get_schedule_status()
+    assert (status["total"], status["launched"], status["expired"], status["pending"]) == (2, 0, 1, 1)
+    scheduler._reindex()
+    assert scheduler.get_schedule_status()["expired"] == 1
+
+
+def test_horizon_only_fills_the_gap_after_the_latest_prediction(scheduler):
+    assert scheduler.extend_horizon(START) == scheduler.horizon_hours
+    assert scheduler.extend_horizon(START) == 0
+    # Une heure plus tard, une seule heure manque au bout de la fenêtre
+    scheduler.clock.advance(3600)
+    assert scheduler.extend_horizon(scheduler.clock.now()) == 1
+
+
+def test_rule_entries_are_not_born_overdue(tmp_path):
+    from schedule_rules import ScheduleRule
+    clock = VirtualClock(datetime(2025, 1, 6, 12, 3, 30))
+    scheduler = PredictionScheduler(
+        FakeClient(clock), FakePredictor(), -1001, -1002,
+        archive=ScheduleArchive(directory=str(tmp_path / 'archives')),
+        leader=FileLeaderLock(str(tmp_path / 'scheduler.lock')),
+        clock=clock, schedule_file=str(tmp_path / 'prediction.yaml'),
+        rules=[ScheduleRule('r', '*/5 * * * *', lead=4)],
+    )
+    assert scheduler.ensure_rule_entries(clock.now()) == 1
+    (numero, data), = scheduler.schedule_data.items()
+    assert scheduler.launch_at(data) >= clock.now()
+    assert scheduler.prediction_at(data) == datetime(2025, 1, 6, 12, 10)
+
+
+def test_horizon_over_a_day_keeps_parseable_game_numbers(scheduler):
+    scheduler.horizon_hours = 30
+    schedule = scheduler.generate_daily_schedule()
+    assert len(schedule) == 30
+    for numero in schedule:
+        assert scheduler._game_number(numero) >= 0
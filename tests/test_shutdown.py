@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+from shutdown import ShutdownCoordinator
+
+
+def test_work_is_accepted_while_draining_and_refused_after_hooks():
+    shutdown = ShutdownCoordinator(timeout=1)
+    saved = []
+    shutdown.register('state', lambda: saved.append(shutdown.inflight))
+
+    async def scenario():
+        with shutdown.track():
+            shutdown.begin_drain()
+            # Drain commencé: la sauvegarde attend la fin du traitement en cours
+            assert shutdown.draining and not shutdown.finished
+            finishing = asyncio.ensure_future(shutdown.finish_async())
+            await asyncio.sleep(0.1)
+            assert not finishing.done()
+        await finishing
+
+    asyncio.run(scenario())
+    assert saved == [0]
+    assert shutdown.finished
+    assert shutdown.record_dropped() == 1
+
+
+def test_hooks_run_off_the_loop_and_are_bounded():
+    shutdown = ShutdownCoordinator(timeout=1, hooks_timeout=0.2)
+    release = threading.Event()
+    shutdown.register('database', lambda: release.wait(5))
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        task = asyncio.ensure_future(ticker())
+        started = time.monotonic()
+        await shutdown.finish_async()
+        task.cancel()
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(scenario())
+    release.set()
+    # Sortie au bout de hooks_timeout malgré le hook bloqué ; la boucle a continué de tourner
+    assert 0.2 <= elapsed < 1
+    assert len(ticks) > 5
+    assert shutdown.finished
+
+
+def test_hooks_write_a_copy_taken_on_the_loop():
+    shutdown = ShutdownCoordinator(timeout=0.05, hooks_timeout=1)
+    state = {'N1205': '⌛'}
+    started, release, written = threading.Event(), threading.Event(), []
+
+    def save(copy):
+        started.set()
+        release.wait(1)
+        written.append(copy)
+
+    shutdown.register('scheduler', save, snapshot=lambda: dict(state))
+
+    async def scenario():
+        finishing = asyncio.ensure_future(shutdown.finish_async())
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        # Une tâche restée active après le drain modifie l'état pendant la sauvegarde
+        state['N1305'] = '⌛'
+        release.set()
+        await finishing
+
+    asyncio.run(scenario())
+    assert written == [{'N1205': '⌛'}]
@@ -0,0 +1,16 @@
+import asyncio
+
+from simulation import simulate
+
+
+def test_emission_rate_stays_flat_over_several_days():
+    report = asyncio.run(simulate(days=4, seed=3))
+    # Une prédiction par heure, sans chaîne parallèle qui s'ajoute au fil des vérifications
+    assert report['launches_per_day'] == [24, 24, 24, 24]
+    assert report['expired_live'] == 0
+
+
+def test_send_latency_shows_up_in_launch_lateness():
+    report = asyncio.run(simulate(days=1, seed=1, latency=(0.2, 0.4)))
+    assert 0.2 <= report['lateness_mean_s'] <= 0.4
+    assert report['lateness_max_s'] <= 0.4
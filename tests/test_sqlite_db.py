@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+
+import pytest
+
+from migrations import SQLITE_MIGRATIONS, migrate_sqlite
+from sqlite_db import SQLiteDatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = SQLiteDatabaseManager(str(tmp_path / 'bot.db'))
+    yield manager
+    manager.close()
+
+
+def entry(statut='⌛', launched=False, **extra):
+    data = {
+        'lanceur': None, 'heure_lancement': '12:01', 'heure_prediction': '12:05',
+        'statut': statut, 'message_id': None, 'chat_id': None,
+        'launched': launched, 'verified': False, 'prediction_format': None,
+    }
+    data.update(extra)
+    return data
+
+
+def sqlite_today(db) -> str:
+    return db._conn().execute("SELECT date('now')").fetchone()[0]
+
+
+def test_schedule_rows_use_the_database_day(db):
+    db.save_auto_prediction_schedule({'N1205': entry(), 'N1305': entry()})
+    days = {row[0] for row in db._conn().execute("SELECT created_at FROM auto_predictions")}
+    # Même jour que les valeurs par défaut du schéma (CURRENT_DATE, UTC)
+    assert days == {sqlite_today(db)}
+    db.update_auto_prediction('N1205', {'statut': '✅0️⃣', 'launched': True})
+    db.save_auto_prediction_schedule({'N1205': entry('✅0️⃣', True), 'N1405': entry()})
+    loaded = db.load_auto_prediction_schedule()
+    assert set(loaded) == {'N1205', 'N1405'}
+    assert loaded['N1205']['statut'] == '✅0️⃣' and loaded['N1205']['launched'] is True
+    assert db.get_stats()['auto']['total'] == 2
+
+
+def test_archived_entries_are_dated_by_their_game_or_the_database_day(db):
+    db.archive_auto_predictions([
+        ('N0905', entry('✅1️⃣', True, prediction_at='2025-01-06 09:05:00')),
+        ('N1005', entry('❌', True)),
+    ])
+    rows = dict(db._conn().execute("SELECT numero, created_at FROM auto_predictions"))
+    assert rows == {'N0905': '2025-01-06', 'N1005': sqlite_today(db)}
+
+
+def test_unknown_columns_are_rejected(db):
+    with pytest.raises(ValueError):
+        db.update_auto_prediction('N1205', {'created_at': '2025-01-01'})
+
+
+def test_config_round_trip_and_invalidation_across_managers(db, tmp_path):
+    db.set_config('schedule_rules', [{'cron': '0 * * * *'}])
+    db.set_config('prediction_interval', 5)
+    assert db.get_config('schedule_rules') == [{'cron': '0 * * * *'}]
+    assert db.get_config('prediction_interval') == 5
+    assert db.get_config('absent', 'défaut') == 'défaut'
+
+    # Une autre instance écrit: le cache est vidé au prochain contrôle de data_version
+    other = SQLiteDatabaseManager(str(tmp_path / 'bot.db'))
+    try:
+        other.set_config('prediction_interval', 7)
+    finally:
+        other.close()
+    db._next_config_poll = 0
+    assert db.get_config('prediction_interval') == 7
+
+
+def test_claim_message_is_true_once(db):
+    assert db.claim_message('#N100. 5(K♠️) - 9(A♥️)', -1001)
+    assert not db.claim_message('#N100. 5(K♠️) - 9(A♥️)', -1001)
+    assert db.claim_message('#N100. 5(K♠️) - 9(A♥️)', -1002)
+    assert db.is_message_processed('#N100. 5(K♠️) - 9(A♥️)', -1001)
+    assert not db.is_message_processed('#N101. 5(K♠️) - 9(A♥️)', -1001)
+
+
+def test_recent_duplicates_are_answered_without_touching_the_database(db, monkeypatch):
+    assert db.claim_message('#N100. 5(K♠️) - 9(A♥️)', -1001)
+
+    def no_database(*args, **kwargs):
+        raise AssertionError("base consultée pour un doublon récent")
+
+    monkeypatch.setattr(db, 'connection', no_database)
+    monkeypatch.setattr(db, '_conn', no_database)
+    assert not db.claim_message('#N100. 5(K♠️) - 9(A♥️)', -1001)
+    assert db.is_message_processed('#N100. 5(K♠️) - 9(A♥️)', -1001)
+
+
+def test_materialized_stats_follow_status_changes(db):
+    db.write_predictions([('save', (game_number, '♠️♥️', None, None, 'manual')) for game_number in range(4)])
+    db.write_predictions([
+        ('status', (0, '✅0️⃣')), ('status', (1, '❌')), ('status', (1, '✅1️⃣')), ('status', (2, '❌')),
+    ])
+    assert db.get_stats()['manual'] == {'total': 4, 'success': 2, 'failure': 1, 'pending': 1}
+    (day, outcomes), = db.get_daily_stats().items()
+    assert day == sqlite_today(db)
+    assert outcomes == {'success': 2, 'failure': 1, 'pending': 1}
+
+
+def test_prune_history_deletes_old_rows_in_batches_and_keeps_stats(db):
+    db.write_predictions([('save', (game_number, '♠️♥️', None, None, 'manual')) for game_number in range(5)])
+    db.claim_message('ancien', -1001)
+    with db.connection() as conn:
+        conn.execute("UPDATE predictions SET created_at = datetime('now', '-90 days') WHERE game_number < 3")
+        conn.execute("UPDATE message_log SET processed_at = datetime('now', '-30 days')")
+    assert db.prune_history(message_days=7, prediction_days=60, batch=2) == {'messages': 1, 'predictions': 3}
+    assert len(db.get_pending_predictions()) == 2
+    assert db.get_stats()['manual']['total'] == 5
+
+
+def test_memory_database_is_shared_between_threads():
+    db = SQLiteDatabaseManager(':memory:')
+    try:
+        thread = threading.Thread(target=db.set_config, args=('stat_channel', -1001))
+        thread.start()
+        thread.join()
+        assert db.get_config('stat_channel') == -1001
+    finally:
+        db.close()
+
+
+def test_migrations_upgrade_an_existing_v1_database(tmp_path):
+    path = str(tmp_path / 'v1.db')
+    conn = sqlite3.connect(path, isolation_level=None)
+    for statement in SQLITE_MIGRATIONS[0][2]:
+        conn.execute(statement)
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("INSERT INTO predictions (game_number, status, created_at) VALUES (1, '✅0️⃣', '2025-01-06 10:00:00')")
+    conn.execute("INSERT INTO prediction_history (day, status, total) VALUES ('2025-01-01', '❌', 3)")
+
+    assert migrate_sqlite(conn) == SQLITE_MIGRATIONS[-1][0]
+    stats = sorted(conn.execute("SELECT day, outcome, total FROM prediction_stats"))
+    assert stats == [('2025-01-01', 'failure', 3), ('2025-01-06', 'success', 1)]
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'prediction_history'").fetchone()
+    # Base à jour: rien n'est réappliqué
+    assert migrate_sqlite(conn) == SQLITE_MIGRATIONS[-1][0]
+    conn.close()
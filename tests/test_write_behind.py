@@ -0,0 +1,110 @@
+import queue
+import threading
+
+import pytest
+
+from sqlite_db import SQLiteDatabaseManager
+from write_behind import WriteBehindBuffer
+
+
+class RecordingManager:
+    """Enregistre les lots reçus ; échoue tant que `failures` > 0"""
+
+    def __init__(self, failures: int = 0, gate: threading.Event = None):
+        self.batches = []
+        self.failures = failures
+        self.gate = gate
+        self.closed = False
+
+    def write_predictions(self, operations):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("base indisponible")
+        self.batches.append(list(operations))
+
+    def get_config(self, key, default=None):
+        return f"config:{key}"
+
+    def close(self):
+        self.closed = True
+
+
+def test_writes_are_batched_and_flushed_on_close():
+    manager = RecordingManager()
+    buffer = WriteBehindBuffer(manager, batch_size=50, interval=60)
+    for game_number in range(120):
+        buffer.save_prediction(game_number, '♠️♥️')
+    buffer.update_prediction_status(3, '✅0️⃣')
+    buffer.close()
+    assert [len(batch) for batch in manager.batches][-1] == 21
+    assert sum(len(batch) for batch in manager.batches) == 121
+    assert all(len(batch) <= 50 for batch in manager.batches)
+    assert manager.batches[-1][-1] == ('status', (3, '✅0️⃣'))
+    assert manager.closed
+
+
+def test_interval_flushes_a_partial_batch():
+    manager = RecordingManager()
+    buffer = WriteBehindBuffer(manager, batch_size=100, interval=0.05)
+    buffer.save_prediction(1, '♠️♥️')
+    deadline = threading.Event()
+    for _ in range(100):
+        if manager.batches:
+            break
+        deadline.wait(0.01)
+    assert manager.batches == [[('save', (1, '♠️♥️', None, None, 'manual'))]]
+    buffer.close()
+
+
+def test_failed_batch_is_requeued_in_order():
+    manager = RecordingManager(failures=1)
+    buffer = WriteBehindBuffer(manager, batch_size=10, interval=60)
+    buffer.close()  # arrête le thread de fond: flush() piloté à la main
+    manager.closed = False
+    for game_number in range(3):
+        buffer.save_prediction(game_number, '♦️♣️')
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    assert buffer.pending == 3
+    assert buffer.flush() == 3
+    assert [args[0] for _, args in manager.batches[0]] == [0, 1, 2]
+
+
+def test_backpressure_blocks_then_raises_when_full():
+    gate = threading.Event()
+    manager = RecordingManager(gate=gate)
+    buffer = WriteBehindBuffer(manager, batch_size=2, interval=60, max_pending=4, block_timeout=0.1)
+    for game_number in range(6):
+        buffer.save_prediction(game_number, '♠️♥️')
+    # Le lot [0, 1] est bloqué dans write_predictions, 4 écritures attendent
+    with pytest.raises(queue.Full):
+        buffer.save_prediction(99, '♠️♥️')
+    gate.set()
+    buffer.close()
+    assert sum(len(batch) for batch in manager.batches) == 6
+
+
+def test_other_attributes_are_delegated():
+    buffer = WriteBehindBuffer(RecordingManager())
+    assert buffer.get_config('stat_channel') == 'config:stat_channel'
+    buffer.close()
+
+
+def test_buffered_writes_reach_sqlite(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    buffer = WriteBehindBuffer(SQLiteDatabaseManager(path), batch_size=25, interval=0.05)
+    for game_number in range(100):
+        buffer.save_prediction(game_number, '♠️♥️', game_number, -1002)
+    for game_number in range(0, 100, 2):
+        buffer.update_prediction_status(game_number, '✅0️⃣')
+    buffer.close()
+
+    manager = SQLiteDatabaseManager(path)
+    try:
+        stats = manager.get_stats()['manual']
+        assert len(manager.get_pending_predictions()) == 50
+        assert stats['total'] == 100
+    finally:
+        manager.close()
@@ -0,0 +1,136 @@
+"""
+Write-behind buffer for prediction writes.
+
+save_prediction() and update_prediction_status() only append to an
+in-memory queue; a background thread applies the queue through
+manager.write_predictions() in one transaction per batch, when it reaches
+WRITE_BEHIND_BATCH operations or when the oldest one has waited
+WRITE_BEHIND_INTERVAL seconds. Publishing a prediction therefore never waits
+on a commit.
+
+When the database falls behind and WRITE_BEHIND_MAX_PENDING operations are
+queued, writers block (backpressure) instead of growing memory without
+bound. close() stops the thread and flushes what is left before closing the
+manager. Every other attribute is delegated to the wrapped manager.
+"""
+import os
+import time
+import queue
+import threading
+from collections import deque
+from typing import Optional
+
+BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH', '200'))
+FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_INTERVAL', '0.5'))
+MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', '10000'))
+# Attente maximale d'un écrivain quand le tampon est plein, puis queue.Full
+BLOCK_TIMEOUT = float(os.getenv('WRITE_BEHIND_TIMEOUT', '5'))
+# Pause avant de réessayer un lot en échec (base indisponible)
+RETRY_SECONDS = 2.0
+
+
+class WriteBehindBuffer:
+    """`buffer.save_prediction(...)` returns at once; the write is committed in the next batch"""
+
+    def __init__(self, manager, batch_size: int = BATCH_SIZE, interval: float = FLUSH_INTERVAL,
+                 max_pending: int = MAX_PENDING, block_timeout: float = BLOCK_TIMEOUT):
+        self.manager = manager
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self._pending: deque = deque()
+        # Date (monotonic) de la plus ancienne écriture en attente
+        self._oldest: Optional[float] = None
+        self._condition = threading.Condition()
+        # Un seul lot appliqué à la fois, dans l'ordre de la file
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name: str):
+        return getattr(self.manager, name)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _enqueue(self, operation: tuple) -> None:
+        deadline = time.monotonic() + self.block_timeout
+        with self._condition:
+            while len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise queue.Full(f"{len(self._pending)} écritures en attente de la base")
+                self._condition.wait(remaining)
+            first = not self._pending
+            if first:
+                self._oldest = time.monotonic()
+            self._pending.append(operation)
+            # Première écriture: le thread dormait sans délai et doit armer l'intervalle
+            if first or len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+
+    def save_prediction(self, game_number: int, suit_combination: str,
+                        message_id: Optional[int] = None, chat_id: Optional[int] = None,
+                        prediction_type: str = 'manual'):
+        """Met en file une prédiction manuelle"""
+        self._enqueue(('save', (game_number, suit_combination, message_id, chat_id, prediction_type)))
+
+    def update_prediction_status(self, game_number: int, status: str):
+        """Met en file un changement de statut"""
+        self._enqueue(('status', (game_number, status)))
+
+    def flush(self) -> int:
+        """Apply one batch now; returns the number of operations written"""
+        with self._flush_lock:
+            with self._condition:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if not batch:
+                return 0
+            try:
+                self.manager.write_predictions(batch)
+            except Exception:
+                # Remis en tête de file, dans le même ordre, pour le prochain essai
+                with self._condition:
+                    self._pending.extendleft(reversed(batch))
+                raise
+            with self._condition:
+                self._oldest = time.monotonic() if self._pending else None
+                # De la place s'est libérée pour les écrivains bloqués
+                self._condition.notify_all()
+            return len(batch)
+
+    def _due(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._oldest >= self.interval
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopping and not self._due():
+                    timeout = self._oldest + self.interval - time.monotonic() if self._pending else None
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Écriture différée en échec ({self.pending} en attente), nouvel essai: {e}")
+                time.sleep(RETRY_SECONDS)
+
+    def close(self) -> None:
+        """Stop the flusher, write everything still queued, then close the manager"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join()
+        try:
+            while self.flush():
+                pass
+        except Exception as e:
+            print(f"❌ {self.pending} écriture(s) perdue(s) à l'arrêt: {e}")
+        self.manager.close()